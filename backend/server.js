@@ -487,6 +487,7 @@ app.put('/api/user/preferences', async (req, res) => {
     if (result.rows.length === 0) {
       return res.status(404).json({ error: 'User not found' });
     }
+    invalidateRecommendations(result.rows[0].user_id);
     res.json({
       message: 'Preferences updated successfully',
       user: {
@@ -559,6 +560,7 @@ app.post('/api/preferences', async (req, res) => {
       );
 
       await client.query('COMMIT');
+      invalidateRecommendations(user_id);
       res.json({ message: 'Preferences saved successfully' });
     } catch (err) {
       await client.query('ROLLBACK');
@@ -624,6 +626,8 @@ app.post('/api/interactions', async (req, res) => {
     );
 
     console.log('Interaction logged successfully');
+    // Cached rankings predate this click, and the service's snapshot may not include it yet
+    invalidateRecommendations(user_id, { event_id, action_type });
 
     res.json({ message: 'Interaction logged' });
   } catch (err) {
@@ -663,6 +667,18 @@ app.post('/api/update-weight', async (req, res) => {
 // Replace LightFM or old backend URL with new local server
 const RECOMMENDATION_API = "https://okruhly-stol-web-app-1.onrender.com/recommend";
 
+// Drop the recommendation service's cached recommendations after a profile change or a click
+function invalidateRecommendations(userId, interaction = {}) {
+  fetch(RECOMMENDATION_API.replace(/\/recommend$/, '/invalidate'), {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'X-Service-Secret': process.env.RECOMMENDATION_SERVICE_SECRET || ''
+    },
+    body: JSON.stringify({ user_id: userId, ...interaction })
+  }).catch((err) => console.error('Recommendation cache invalidation failed:', err));
+}
+
 // Fetch recommended events based on preferences
 app.get('/api/recommendations', async (req, res) => {
   const userId = req.query.user_id;
@@ -778,6 +794,7 @@ app.post('/api/update-location', async (req, res) => {
       return res.status(404).json({ error: 'User not found' });
     }
 
+    invalidateRecommendations(user_id);
     res.json({ 
       message: 'Location updated successfully',
       user: {
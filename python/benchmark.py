@@ -0,0 +1,260 @@
+"""Offline benchmarks for the recommendation service on synthetic interaction data.
+
+Run with `python benchmark.py` from this directory; no database is needed.
+"""
+import time
+from datetime import datetime, timedelta, UTC
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+from recommendation_service import (
+    InteractionStore, get_disliked_event_ids, get_recent_event_ids, build_user_event_matrix, user_similarity_row, collaborative_scores, train_als, ModelSnapshot,
+    candidate_mask, top_positions, build_event_content_matrix, event_content_text, ContentVectorizer, co_interaction_vectors, build_item_neighbours, item_neighbour_scores, ITEM_CONTENT_SHARE,
+)
+
+def synthetic_interactions(n_users=10000, n_events=5000, per_user=20, seed=42):
+    """Interactions with a long-tailed event popularity, roughly like the real table"""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, n_events + 1) ** 0.8
+    weights /= weights.sum()
+    users = np.repeat(np.arange(1, n_users + 1), per_user)
+    events = rng.choice(np.arange(1, n_events + 1), size=len(users), p=weights)
+    ratings = rng.choice([1, 1, 1, -1], size=len(users))
+    df = pd.DataFrame({'user_id': users, 'event_id': events, 'rating': ratings})
+    return df.drop_duplicates(subset=['user_id', 'event_id'], keep='last').reset_index(drop=True)
+
+def _timed(fn, repeat=1):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+def _sparse_nbytes(matrix):
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+def bench_matrix(n_users=10000, n_events=5000, requests=20):
+    """Dense pivot_table + full cosine_similarity against the sparse CSR path"""
+    df = synthetic_interactions(n_users, n_events)
+    targets = np.random.default_rng(0).integers(0, df['user_id'].nunique(), size=requests)
+    print(f"{len(df)} interactions, {df['user_id'].nunique()} users x {df['event_id'].nunique()} events")
+
+    dense, dense_build = _timed(lambda: df.pivot_table(index='user_id', columns='event_id', values='rating', fill_value=0))
+    dense_similarity, dense_similarity_build = _timed(lambda: cosine_similarity(dense))
+    values = dense.values
+    _, dense_request = _timed(lambda: [dense_similarity[t] @ values for t in targets])
+    dense_bytes = values.nbytes + dense_similarity.nbytes
+
+    (matrix, _, _), sparse_build = _timed(lambda: build_user_event_matrix(df))
+    normalized = normalize(matrix)
+    similarity, sparse_similarity_build = _timed(lambda: (normalized @ normalized.T).tocsr())
+    _, sparse_request = _timed(lambda: [(similarity[t] @ matrix).toarray() for t in targets])
+    sparse_bytes = _sparse_nbytes(matrix) + _sparse_nbytes(similarity)
+
+    print(f"{'':<8}{'matrix build':>14}{'similarity':>14}{'per request':>14}{'memory':>12}")
+    print(f"{'dense':<8}{dense_build:>13.3f}s{dense_similarity_build:>13.3f}s"
+          f"{dense_request / requests * 1000:>12.2f}ms{dense_bytes / 2**20:>10.0f}MB")
+    print(f"{'sparse':<8}{sparse_build:>13.3f}s{sparse_similarity_build:>13.3f}s"
+          f"{sparse_request / requests * 1000:>12.2f}ms{sparse_bytes / 2**20:>10.0f}MB")
+
+def bench_similarity(n_users=10000, n_events=5000, requests=200, top_k=50):
+    """Precomputed users x users similarity against one similarity row per request"""
+    df = synthetic_interactions(n_users, n_events)
+    matrix, user_ids, event_ids = build_user_event_matrix(df)
+    normalized = normalize(matrix)
+    snapshot = ModelSnapshot(
+        version=0, built_at=0, interaction_matrix=matrix, normalized=normalized,
+        popularity=np.zeros(len(event_ids)), user_index={}, event_ids=event_ids, event_df=pd.DataFrame(),
+    )
+    targets = np.random.default_rng(0).integers(0, len(user_ids), size=requests)
+
+    similarity, full_build = _timed(lambda: (normalized @ normalized.T).tocsr())
+    _, full_request = _timed(lambda: [matrix.T @ similarity[t].toarray().ravel() for t in targets])
+    _, row_request = _timed(lambda: [matrix.T @ user_similarity_row(snapshot, t, 0) for t in targets])
+    _, top_k_request = _timed(lambda: [matrix.T @ user_similarity_row(snapshot, t, top_k) for t in targets])
+
+    print(f"full similarity: {full_build:.3f}s build, {_sparse_nbytes(similarity) / 2**20:.0f}MB, "
+          f"{full_request / requests * 1000:.2f}ms per request")
+    print(f"single row:      {row_request / requests * 1000:.2f}ms per request, "
+          f"{_sparse_nbytes(normalized) / 2**20:.1f}MB normalised rows")
+    print(f"single row, top {top_k}: {top_k_request / requests * 1000:.2f}ms per request")
+
+def clustered_interactions(n_users=10000, n_events=5000, per_user=20, clusters=50, seed=42):
+    """Interactions where users mostly like events of their own taste cluster and dislike a few others"""
+    rng = np.random.default_rng(seed)
+    user_cluster = rng.integers(0, clusters, size=n_users)
+    event_cluster = rng.integers(0, clusters, size=n_events)
+    members = [np.flatnonzero(event_cluster == c) for c in range(clusters)]
+    rows = []
+    for user in range(n_users):
+        liked = rng.choice(members[user_cluster[user]], size=int(per_user * 0.8))
+        other = rng.integers(0, n_events, size=per_user - len(liked))
+        rows += [(user + 1, event + 1, 1) for event in liked]
+        rows += [(user + 1, event + 1, 1 if event_cluster[event] == user_cluster[user] else -1) for event in other]
+    df = pd.DataFrame(rows, columns=['user_id', 'event_id', 'rating'])
+    return df.drop_duplicates(subset=['user_id', 'event_id'], keep='last').reset_index(drop=True)
+
+def bench_engines(n_users=10000, n_events=5000, requests=500, depth=10):
+    """Neighbourhood against ALS collaborative scores: training, per-request latency and held-out hit rate"""
+    df = clustered_interactions(n_users, n_events)
+    rng = np.random.default_rng(0)
+    # Hold out one liked event for each sampled user and see whether it comes back in the top `depth`
+    positives = df[df['rating'] > 0]
+    held_out = positives.groupby('user_id').sample(1, random_state=0)
+    held_out = held_out[held_out['user_id'].isin(rng.choice(df['user_id'].unique(), size=requests, replace=False))]
+    train = df.drop(held_out.index)
+    matrix, user_ids, event_ids = build_user_event_matrix(train)
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    event_index = {event_id: i for i, event_id in enumerate(event_ids)}
+    snapshot = ModelSnapshot(
+        version=0, built_at=0, interaction_matrix=matrix, normalized=normalize(matrix),
+        popularity=np.zeros(len(event_ids)), user_index=user_index, event_ids=event_ids, event_df=pd.DataFrame(),
+    )
+    (user_factors, event_factors), training = _timed(lambda: train_als(matrix))
+    factor_snapshot = ModelSnapshot(**{**snapshot.__dict__, 'user_factors': user_factors, 'event_factors': event_factors})
+    targets = [user_index[user_id] for user_id in held_out['user_id']]
+    expected = [event_index.get(event_id, -1) for event_id in held_out['event_id']]
+
+    def hit_rate(model):
+        hits = 0
+        for row, event in zip(targets, expected):
+            scores = collaborative_scores(model, [row]).ravel()
+            scores[matrix[row].indices] = -np.inf  # already seen
+            hits += event in np.argpartition(-scores, depth)[:depth]
+        return hits / len(targets)
+
+    print(f"{len(train)} interactions, {len(targets)} held-out likes")
+    print(f"{'':<15}{'training':>10}{'per request':>14}{'hit rate@' + str(depth):>14}")
+    for name, model, build in [('neighbourhood', snapshot, 0.0), ('als', factor_snapshot, training)]:
+        _, request = _timed(lambda: [collaborative_scores(model, [row]) for row in targets])
+        print(f"{name:<15}{build:>9.2f}s{request / len(targets) * 1000:>12.2f}ms{hit_rate(model):>14.1%}")
+
+def synthetic_events(event_ids, seed=42):
+    """Catalogue rows with the fields the content matrix reads"""
+    rng = np.random.default_rng(seed)
+    types = ['Koncert', 'Divadlo', 'Výstava', 'Festival', 'Šport', 'Workshop', 'Kino', 'Trh']
+    towns = ['Prešov', 'Stará Ľubovňa', 'Bardejov', 'Svidník', 'Humenné', 'Sabinov', 'Vranov nad Topľou', 'Snina']
+    return [{'id': event_id, 'event_type': rng.choice(types), 'location': f"{rng.choice(towns)}, {rng.choice(['námestie', 'amfiteáter', 'kultúrny dom', 'hala'])}",
+             'start_time': f"{rng.integers(8, 23)}:00"} for event_id in event_ids]
+
+def bench_item_neighbours(n_users=10000, n_events=5000, requests=500):
+    """Offline item-item neighbour table against scoring liked events over the whole catalogue per request"""
+    df = clustered_interactions(n_users, n_events)
+    matrix, user_ids, event_ids = build_user_event_matrix(df)
+    content, _ = build_event_content_matrix(synthetic_events(event_ids))
+    event_columns = np.arange(len(event_ids))
+    co_interaction = co_interaction_vectors(matrix, event_columns)
+    (neighbours, similarities), build = _timed(lambda: build_item_neighbours(content, co_interaction))
+    snapshot = ModelSnapshot(
+        version=0, built_at=0, interaction_matrix=matrix, normalized=normalize(matrix),
+        popularity=np.zeros(len(event_ids)), user_index={}, event_ids=event_ids, event_df=pd.DataFrame(),
+        event_columns=event_columns, column_positions=event_columns, item_neighbours=neighbours, item_similarities=similarities,
+    )
+    targets = np.random.default_rng(0).integers(0, len(user_ids), size=requests)
+
+    def full_pass(row):
+        liked = matrix[row].indices[matrix[row].data > 0]
+        similarity = ITEM_CONTENT_SHARE * (content[liked] @ content.T) + (1 - ITEM_CONTENT_SHARE) * (co_interaction[liked] @ co_interaction.T)
+        return np.asarray(similarity.sum(axis=0)).ravel()
+
+    _, full_request = _timed(lambda: [full_pass(row) for row in targets])
+    _, table_request = _timed(lambda: [item_neighbour_scores(snapshot, row) for row in targets])
+    print(f"neighbour table: {build:.2f}s build, {neighbours.shape[1]} per event, "
+          f"{(neighbours.nbytes + similarities.nbytes) / 2**20:.1f}MB")
+    print(f"{'full pass':<16}{full_request / requests * 1000:>8.2f}ms per request")
+    print(f"{'neighbour table':<16}{table_request / requests * 1000:>8.2f}ms per request")
+
+def bench_content(n_events=5000, runs=20, per_run=20):
+    """Refitting TF-IDF over the catalogue after each scraper run against embedding only the new events"""
+    events = synthetic_events(range(1, n_events + 1))
+    fresh = synthetic_events(range(n_events + 1, n_events + runs * per_run + 1), seed=7)
+    vectorizer = ContentVectorizer()
+    build_event_content_matrix(events, vectorizer)
+
+    def refit():
+        for run in range(1, runs + 1):
+            catalogue = events + fresh[:run * per_run]
+            TfidfVectorizer().fit_transform([event_content_text(event) for event in catalogue])
+
+    def incremental():
+        for run in range(1, runs + 1):
+            catalogue = events + fresh[:run * per_run]
+            build_event_content_matrix(catalogue, vectorizer)
+
+    _, refit_time = _timed(refit)
+    _, incremental_time = _timed(incremental)
+    # Same similarities as a TF-IDF fit over the final catalogue, up to hash collisions
+    catalogue = events + fresh
+    content, _ = build_event_content_matrix(catalogue, vectorizer)
+    fitted = TfidfVectorizer().fit_transform([event_content_text(event) for event in catalogue])
+    sample = np.random.default_rng(0).integers(0, len(catalogue), size=200)
+    difference = np.abs((content[sample] @ content.T - fitted[sample] @ fitted.T).toarray()).max()
+    print(f"{runs} runs of {per_run} new events on a {n_events} event catalogue")
+    print(f"refit:       {refit_time / runs * 1000:>7.1f}ms per run")
+    print(f"incremental: {incremental_time / runs * 1000:>7.1f}ms per run, max similarity difference {difference:.1e}")
+
+def bench_ranking(sizes=(5000, 20000, 80000), excluded=200, depth=30, requests=50):
+    """Dict filter + full sort over every event against a candidate mask + partial selection"""
+    print(f"{'events':>8}{'dict + sort':>14}{'arrays':>10}")
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        event_ids = rng.permutation(n * 2)[:n]
+        scores = rng.random(n)
+        excluded_ids = set(rng.choice(event_ids, size=excluded, replace=False).tolist())
+        snapshot = ModelSnapshot(
+            version=0, built_at=0, interaction_matrix=None, normalized=None,
+            popularity=np.zeros(0), user_index={}, event_ids=[], event_df=pd.DataFrame(), event_columns=np.zeros(n, dtype=int),
+            event_positions={event_id: position for position, event_id in enumerate(event_ids.tolist())},
+        )
+
+        def dict_rank():
+            scores_dict = dict(zip(event_ids.tolist(), scores.tolist()))
+            scores_dict = {k: v for k, v in scores_dict.items() if k not in excluded_ids}
+            return sorted(scores_dict.keys(), key=lambda x: scores_dict[x], reverse=True)[:depth]
+
+        def array_rank():
+            return event_ids[top_positions(scores, candidate_mask(snapshot, excluded_ids), depth)].tolist()
+
+        before, before_time = _timed(dict_rank, requests)
+        after, after_time = _timed(array_rank, requests)
+        assert before == after, f"{n}: rankings differ"
+        print(f"{n:>8}{before_time * 1000:>12.2f}ms{after_time * 1000:>8.2f}ms")
+
+def bench_exclusions(n_users=10000, n_events=5000, requests=200):
+    """Masking the whole interactions table per request against the per-user exclusion index"""
+    df = synthetic_interactions(n_users, n_events)
+    now = datetime.now(UTC)
+    # Well inside or well outside the 2 minute window, so both lookups see the same recent set
+    ages = np.random.default_rng(0).choice([30, 600], size=len(df))
+    df['interaction_time'] = pd.to_datetime(now - pd.to_timedelta(ages, unit='s'))
+    store = InteractionStore()
+    _, index_build = _timed(lambda: store._update_exclusions(df[['user_id', 'event_id', 'rating', 'interaction_time']].itertuples(index=False)))
+    snapshot = ModelSnapshot(
+        version=0, built_at=0, interaction_matrix=None, normalized=None, popularity=np.zeros(0), user_index={},
+        event_ids=[], event_df=pd.DataFrame(), disliked=store.disliked, interested=store.interested,
+    )
+    targets = np.random.default_rng(1).integers(1, n_users + 1, size=requests).tolist()
+
+    def masks(user_id):
+        recent_threshold = datetime.now(UTC) - timedelta(minutes=2)
+        disliked = set(df[(df['user_id'] == user_id) & (df['rating'] == -1)]['event_id'])
+        recent = set(df[(df['user_id'] == user_id) & (df['rating'] == 1) & (df['interaction_time'] > recent_threshold)]['event_id'])
+        return disliked, recent
+
+    before, before_time = _timed(lambda: [masks(user_id) for user_id in targets])
+    after, after_time = _timed(lambda: [(get_disliked_event_ids(snapshot, user_id), get_recent_event_ids(snapshot, user_id)) for user_id in targets])
+    assert before == after, "exclusion index disagrees with the interactions table"
+    print(f"{len(df)} interactions, index built in {index_build:.2f}s")
+    print(f"dataframe masks: {before_time / requests * 1000:>7.3f}ms per request")
+    print(f"exclusion index: {after_time / requests * 1000:>7.3f}ms per request")
+
+if __name__ == "__main__":
+    bench_matrix()
+    bench_similarity()
+    bench_engines()
+    bench_item_neighbours()
+    bench_content()
+    bench_ranking()
+    bench_exclusions()
@@ -1,23 +1,80 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, has_request_context
+import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
+import scipy.sparse as sp
 import psycopg2
 import logging
 import time
 import os
 import random
+import hmac
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, UTC
 from dotenv import load_dotenv
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import MultiLabelBinarizer
-from collections import defaultdict
-from math import radians, cos, sin, asin, sqrt
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import MultiLabelBinarizer, normalize
+from sklearn.neighbors import BallTree
+from collections import defaultdict, OrderedDict
+from math import radians
 
 # Tunable weights for hybrid recommendation
 CONTENT_WEIGHT = 0.3
 COLLAB_WEIGHT = 0.7
 POPULAR_WEIGHT = 0.1
+ITEM_WEIGHT = 0.2  # Weight for "more like the events you liked" from the item neighbour table
 DISTANCE_WEIGHT = 0.3  # Weight for distance penalty
+# Drop events outside the user's preferredDistance instead of only penalising them
+DISTANCE_PREFILTER = os.getenv('DISTANCE_PREFILTER', '0') == '1'
+# Drop events whose last day has passed before ranking
+UPCOMING_PREFILTER = os.getenv('UPCOMING_PREFILTER', '0') == '1'
+
+# Preference score for an event in a preferred category / at the preferred time of day
+CATEGORY_MATCH_SCORE = 1.0
+TIME_MATCH_SCORE = 0.5
+# preferredTime values from the profile page, bucketed by the event's start hour
+TIME_BUCKETS = ['morning', 'afternoon', 'evening', 'night']
+
+# How often (seconds) the background thread rebuilds the model snapshot
+SNAPSHOT_REFRESH_SECONDS = int(os.getenv('SNAPSHOT_REFRESH_SECONDS', '300'))
+# Refreshes only pull new interactions; a full reload picks up deleted rows
+FULL_RELOAD_SECONDS = int(os.getenv('FULL_RELOAD_SECONDS', '3600'))
+# Only the k most similar users contribute to collaborative scores (0 = all users)
+NEIGHBOUR_TOP_K = int(os.getenv('NEIGHBOUR_TOP_K', '0'))
+# Collaborative scorer: 'neighbourhood' (user-user cosine) or 'als' (implicit matrix factorisation)
+COLLAB_ENGINE = os.getenv('COLLAB_ENGINE', 'neighbourhood')
+ALS_FACTORS = int(os.getenv('ALS_FACTORS', '32'))
+ALS_ITERATIONS = int(os.getenv('ALS_ITERATIONS', '15'))
+# Refreshes start from the previous factors and only need a few more sweeps
+ALS_REFRESH_ITERATIONS = int(os.getenv('ALS_REFRESH_ITERATIONS', '3'))
+ALS_REGULARIZATION = float(os.getenv('ALS_REGULARIZATION', '0.1'))
+# Confidence of an interaction is 1 + alpha; "not_interested" is a confident 0, not a missing value
+ALS_ALPHA = float(os.getenv('ALS_ALPHA', '10'))
+# Item-item neighbour table: neighbours kept per event and the content share of their similarity
+ITEM_NEIGHBOURS_K = int(os.getenv('ITEM_NEIGHBOURS_K', '20'))
+ITEM_CONTENT_SHARE = float(os.getenv('ITEM_CONTENT_SHARE', '0.5'))
+ITEM_NEIGHBOURS_CHUNK = 1024  # events scored against the catalogue at once while building the table
+# Hashed vocabulary size of the event content vectors
+CONTENT_FEATURES = 2 ** 18
+# Embedded rows are compacted once replaced or removed events leave this many stale rows
+CONTENT_COMPACT_AFTER = 1024
+# Users scored per matrix product in /recommend/batch, and the most users one call may ask for
+BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', '256'))
+BATCH_MAX_USERS = int(os.getenv('BATCH_MAX_USERS', '5000'))
+BATCH_MAX_TOP_N = int(os.getenv('BATCH_MAX_TOP_N', '100'))  # most recommendations per user one call may ask for
+
+# Per-user cache of ranked recommendations
+RECOMMENDATION_CACHE_SIZE = int(os.getenv('RECOMMENDATION_CACHE_SIZE', '10000'))
+RECOMMENDATION_CACHE_TTL = int(os.getenv('RECOMMENDATION_CACHE_TTL', '600'))  # seconds
+# Extra ranked events kept per entry so read-time exclusions can be filtered out without a recompute
+RECOMMENDATION_CACHE_DEPTH = int(os.getenv('RECOMMENDATION_CACHE_DEPTH', '20'))
+
+# Database connection pool
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '5'))
+DB_POOL_MAX_LIFETIME = int(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))  # seconds before a connection is recycled
+DB_POOL_HEALTH_CHECK_AFTER = int(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', '30'))  # idle seconds before SELECT 1 on checkout
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '10'))  # seconds to wait for a free connection
 
 app = Flask(__name__)
 
@@ -30,6 +87,8 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'backend', 'database.env'))
+# Shared with the backend, which sends it as X-Service-Secret; /invalidate and /refresh refuse calls without it
+SERVICE_SECRET = os.getenv('RECOMMENDATION_SERVICE_SECRET', '')
 
 def get_db_connection():
     """Helper function to create a new database connection"""
@@ -42,98 +101,271 @@ def get_db_connection():
         sslmode='require'
     )
 
+class PoolTimeout(Exception):
+    """Raised when no pooled connection frees up within the checkout timeout"""
+
+class ConnectionPool:
+    """Bounded pool of database connections with health checks and max-lifetime recycling"""
+
+    def __init__(self, connect, max_size=5, max_lifetime=1800, health_check_after=30, timeout=10):
+        self._connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._idle = []  # (conn, created_at, returned_at), most recently returned last
+        self._created_at = {}  # id(conn) -> creation time of every open connection
+        self._size = 0  # open connections plus ones being opened
+        self._in_use = 0
+        self.stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'connects': 0,
+            'connect_time': 0.0,
+            'recycled': 0,
+            'failed_health_checks': 0,
+        }
+
+    def getconn(self):
+        started = time.monotonic()
+        waited = False
+        conn = None
+        with self._condition:
+            while not self._idle and self._size >= self.max_size:
+                waited = True
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available within {self.timeout}s")
+                self._condition.wait(remaining)
+            if self._idle:
+                conn, created_at, returned_at = self._idle.pop()
+            else:
+                self._size += 1
+            self._in_use += 1
+            self.stats['checkouts'] += 1
+            if waited:
+                self.stats['waits'] += 1
+                self.stats['wait_time'] += time.monotonic() - started
+
+        if conn is not None and not self._is_healthy(conn, created_at, returned_at):
+            # The slot is kept and backed by a fresh connection below
+            with self._condition:
+                self._created_at.pop(id(conn), None)
+            self._close(conn)
+            conn = None
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+        return conn
+
+    def putconn(self, conn):
+        healthy = not conn.closed
+        if healthy:
+            try:
+                conn.rollback()  # end the implicit transaction so the connection goes back clean
+            except psycopg2.Error:
+                healthy = False
+        with self._condition:
+            self._in_use -= 1
+            created_at = self._created_at.get(id(conn), 0)
+            if healthy and time.monotonic() - created_at < self.max_lifetime:
+                self._idle.append((conn, created_at, time.monotonic()))
+            else:
+                if healthy:
+                    self.stats['recycled'] += 1
+                self._created_at.pop(id(conn), None)
+                self._size -= 1
+                self._close(conn)
+            self._condition.notify()
+
+    def metrics(self):
+        with self._condition:
+            metrics = dict(self.stats)
+            metrics.update({
+                'size': self._size,
+                'max_size': self.max_size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'avg_connect_time': self.stats['connect_time'] / self.stats['connects'] if self.stats['connects'] else 0.0,
+            })
+        return metrics
+
+    def _open(self):
+        started = time.monotonic()
+        conn = self._connect()
+        elapsed = time.monotonic() - started
+        with self._condition:
+            self._created_at[id(conn)] = time.monotonic()
+            self.stats['connects'] += 1
+            self.stats['connect_time'] += elapsed
+        return conn
+
+    def _is_healthy(self, conn, created_at, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - created_at >= self.max_lifetime:
+            with self._condition:
+                self.stats['recycled'] += 1
+            return False
+        if time.monotonic() - returned_at >= self.health_check_after:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                with self._condition:
+                    self.stats['failed_health_checks'] += 1
+                return False
+        return True
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+_db_pool = ConnectionPool(
+    get_db_connection,
+    max_size=DB_POOL_MAX_SIZE,
+    max_lifetime=DB_POOL_MAX_LIFETIME,
+    health_check_after=DB_POOL_HEALTH_CHECK_AFTER,
+    timeout=DB_POOL_TIMEOUT,
+)
+
+@contextmanager
+def db_connection():
+    """Check out a pooled connection; within a request the same connection is reused until teardown"""
+    if has_request_context():
+        if 'db_conn' not in g:
+            g.db_conn = _db_pool.getconn()
+        try:
+            yield g.db_conn
+        except psycopg2.Error:
+            # Leave the connection usable for the request's remaining queries
+            if not g.db_conn.closed:
+                try:
+                    g.db_conn.rollback()
+                except psycopg2.Error:
+                    pass
+            raise
+        return
+    conn = _db_pool.getconn()
+    try:
+        yield conn
+    finally:
+        _db_pool.putconn(conn)
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        _db_pool.putconn(conn)
+
+DEFAULT_PROFILE = ({}, None, None)
+
+def get_user_profiles(user_ids):
+    """Fetch preferences and location for several users in one query, memoised for the current request.
+
+    Returns {user_id: (preferences, latitude, longitude)}; unknown users get DEFAULT_PROFILE.
+    Database errors are raised, so callers can tell a failed load from a user without a profile.
+    """
+    profiles = g.setdefault('user_profiles', {}) if has_request_context() else {}
+    missing = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in profiles]
+    if missing:
+        try:
+            with db_connection() as conn, conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT user_id, preferences, latitude, longitude FROM users WHERE user_id = ANY(%s)",
+                    (missing,)
+                )
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error fetching user profiles: {e}")
+            raise
+        for user_id in missing:
+            profiles[user_id] = DEFAULT_PROFILE
+        for user_id, preferences, latitude, longitude in rows:
+            if latitude is not None and longitude is not None:
+                profiles[user_id] = (preferences or {}, float(latitude), float(longitude))
+            else:
+                profiles[user_id] = (preferences or {}, None, None)
+        located = sum(1 for user_id in missing if profiles[user_id][1] is not None)
+        if located < len(missing):
+            logger.warning(f"No location found for {len(missing) - located} of {len(missing)} users")
+    return {user_id: profiles[user_id] for user_id in user_ids}
+
+def get_user_profile(user_id):
+    """Fetch the user's preferences and location"""
+    return get_user_profiles([user_id])[user_id]
+
+EARTH_RADIUS_KM = 6371
+
 def haversine(lat1, lon1, lat2, lon2):
-    """Calculate the great circle distance between two points on the earth"""
-    R = 6371  # Earth radius in km
-    
-    # Convert decimal degrees to radians
-    lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-    
-    # Haversine formula
+    """Great circle distance in km between points given in radians; works elementwise on arrays"""
     dlat = lat2 - lat1
     dlon = lon2 - lon1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    
-    return R * c
-
-def get_user_location(user_id):
-    """Fetch user's location from the database"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT latitude, longitude FROM users WHERE user_id = %s",
-            (user_id,)
-        )
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
-        if result and result[0] is not None and result[1] is not None:
-            return float(result[0]), float(result[1])
-        logger.warning(f"No location found for user {user_id}")
-        return None, None
-    except Exception as e:
-        logger.error(f"Error fetching user location: {e}")
-        return None, None
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
 
-def get_event_coordinates(event_ids):
-    """Fetch coordinates for multiple events in one query"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        placeholders = ','.join(['%s'] * len(event_ids))
-        cursor.execute(
-            f"SELECT id, latitude, longitude FROM events WHERE id IN ({placeholders})",
-            event_ids
-        )
-        coords = {id: (lat, lon) for id, lat, lon in cursor.fetchall()}
-        cursor.close()
-        conn.close()
-        return coords
-    except Exception as e:
-        logger.error(f"Error fetching event coordinates: {e}")
-        return {}
+def build_geo_index(event_df):
+    """Event coordinates in radians (NaN when unknown) and a BallTree over the events that have them"""
+    if event_df.empty:
+        return np.zeros((0, 2)), None, np.zeros(0, dtype=int)
+    coords = np.radians(np.ascontiguousarray(
+        event_df[['latitude', 'longitude']].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    ))
+    rows = np.flatnonzero(~np.isnan(coords).any(axis=1))
+    geo_index = BallTree(coords[rows], metric='haversine') if len(rows) else None
+    return coords, geo_index, rows
 
-def apply_distance_penalty(scores, event_ids, user_lat, user_lon, preferences):
-    """Apply distance-based penalty to event scores"""
-    if user_lat is None or user_lon is None:
-        return scores
-        
-    # Get max distance from preferences
+def get_max_distance_km(preferences):
+    """Translate the preferredDistance range into a radius in km"""
     preferred_range = preferences.get("preferredDistance", "0-5")
-    max_distance_km = {
+    return {
         "0-5": 5,
         "5-15": 15,
+        "5-20": 20,
         "15-30": 30,
-        "30+": 100
+        "20-35": 35,
+        "30+": 100,
+        "35+": 100
     }.get(preferred_range, 5)
-    
-    # Get coordinates for all events
-    event_coords = get_event_coordinates(event_ids)
-    
-    # Apply distance penalty to scores
-    for event_id in event_ids:
-        if event_id in event_coords:
-            event_lat, event_lon = event_coords[event_id]
-            if event_lat is not None and event_lon is not None:
-                try:
-                    distance = haversine(user_lat, user_lon, float(event_lat), float(event_lon))
-                    distance_penalty = min(distance / max_distance_km, 2.0)  # normalize
-                    scores[event_id] -= distance_penalty * DISTANCE_WEIGHT
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Error calculating distance for event {event_id}: {e}")
-    
-    return scores
 
-# Fetch interaction data from database
-def get_interactions():
-    logger.info("Fetching interaction data from database")
+def events_within_distance(snapshot, user_lat, user_lon, radius_km):
+    """Boolean mask over event_df of events within radius_km of the user, from the spatial index"""
+    mask = np.zeros(len(snapshot.event_coords), dtype=bool)
+    if snapshot.geo_index is not None:
+        hits = snapshot.geo_index.query_radius(np.radians([[user_lat, user_lon]]), r=radius_km / EARTH_RADIUS_KM)[0]
+        mask[snapshot.geo_index_rows[hits]] = True
+    return mask
+
+def apply_distance_penalty(scores, snapshot, user_lat, user_lon, preferences):
+    """Apply distance-based penalty to an array of event scores in event_df order"""
+    if user_lat is None or user_lon is None or len(scores) == 0:
+        return scores
+
+    # Get max distance from preferences
+    max_distance_km = get_max_distance_km(preferences)
+
+    distances = haversine(radians(user_lat), radians(user_lon), snapshot.event_coords[:, 0], snapshot.event_coords[:, 1])
+    # Events without coordinates are not penalised
+    distance_penalty = np.nan_to_num(np.minimum(distances / max_distance_km, 2.0))  # normalize
+    return scores - distance_penalty * DISTANCE_WEIGHT
+
+# Fetch interaction data from database, optionally only rows at or after `since`
+def get_interactions(since=None):
+    logger.info("Fetching interaction data from database" + (f" since {since}" if since is not None else ""))
     try:
-        conn = get_db_connection()
-        query = """
+        query = f"""
             SELECT DISTINCT ON (user_id, event_id)
                    user_id, event_id,
                    interaction_time,
@@ -143,209 +375,876 @@ def get_interactions():
                        ELSE 0 
                    END AS rating
             FROM user_event_interactions
+            {"WHERE interaction_time >= %s" if since is not None else ""}
             ORDER BY user_id, event_id, interaction_time DESC;
         """
-        df = pd.read_sql_query(query, conn)
+        with db_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=(since,) if since is not None else None)
         logger.info(f"Retrieved {len(df)} interactions from database")
-        conn.close()
         return df
     except Exception as e:
         logger.error(f"Error fetching interactions: {e}")
         raise
 
-# Build user-event matrix for collaborative filtering
+# Build sparse user-event matrix for collaborative filtering
 def build_user_event_matrix(df):
+    """Build a CSR users x events rating matrix along with the user and event ids of its rows and columns"""
     logger.info("Building user-event matrix")
     try:
-        matrix = df.pivot_table(index='user_id', columns='event_id', values='rating', fill_value=0)
-        logger.info(f"Matrix built with shape: {matrix.shape}")
-        return matrix
+        rows, user_ids = pd.factorize(df['user_id'])
+        cols, event_ids = pd.factorize(df['event_id'])
+        matrix = sp.csr_matrix(
+            (df['rating'].to_numpy(dtype=float), (rows, cols)),
+            shape=(len(user_ids), len(event_ids))
+        )
+        matrix.eliminate_zeros()
+        logger.info(f"Matrix built with shape: {matrix.shape}, {matrix.nnz} stored ratings")
+        return matrix, list(user_ids), list(event_ids)
     except Exception as e:
         logger.error(f"Error building user-event matrix: {e}")
         raise
 
+def event_content_text(event):
+    """Combine relevant features into one string per event"""
+    return f"{event.get('event_type') or ''} {event.get('location') or ''} {event.get('start_time') or ''}"
+
+class ContentVectorizer:
+    """Hashed term counts per event plus document frequencies, kept current event by event.
+
+    Only new events and events whose text changed are tokenised; IDF weights come from the
+    stored document frequencies when the matrix is read, so nothing is ever refitted.
+    """
+
+    def __init__(self, n_features=CONTENT_FEATURES):
+        self.hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+        self.counts = sp.csr_matrix((0, n_features))
+        self.rows = {}  # event_id -> (row in counts, text it was embedded from)
+        self.document_frequency = np.zeros(n_features)
+
+    def update(self, event_ids, texts):
+        """Embed new or changed events and forget events that are gone; returns how many were embedded"""
+        current = dict(zip(event_ids, texts))
+        for event_id in [event_id for event_id, (_, text) in self.rows.items() if current.get(event_id) != text]:
+            self._forget(event_id)
+        added = [(event_id, text) for event_id, text in current.items() if event_id not in self.rows]
+        if added:
+            counts = self.hasher.transform([text for _, text in added]).tocsr()
+            counts.sum_duplicates()
+            self.document_frequency += np.bincount(counts.indices, minlength=counts.shape[1])
+            start = self.counts.shape[0]
+            self.counts = sp.vstack([self.counts, counts], format='csr')
+            for offset, (event_id, text) in enumerate(added):
+                self.rows[event_id] = (start + offset, text)
+        if self.counts.shape[0] - len(self.rows) > CONTENT_COMPACT_AFTER:
+            self._compact()
+        return len(added)
+
+    def _forget(self, event_id):
+        row, _ = self.rows.pop(event_id)
+        self.document_frequency[self.counts.indices[self.counts.indptr[row]:self.counts.indptr[row + 1]]] -= 1
+
+    def _compact(self):
+        event_ids = list(self.rows)
+        self.counts = self.counts[[self.rows[event_id][0] for event_id in event_ids]]
+        self.rows = {event_id: (row, self.rows[event_id][1]) for row, event_id in enumerate(event_ids)}
+
+    def idf(self):
+        """Smoothed IDF over the events currently embedded, as TfidfVectorizer computes it"""
+        return np.log((1 + len(self.rows)) / (1 + self.document_frequency)) + 1
+
+    def transform(self, event_ids):
+        """Unit-length TF-IDF rows of already embedded events, in the given order"""
+        counts = self.counts[[self.rows[event_id][0] for event_id in event_ids]]
+        if counts.shape[0] == 0:
+            return counts
+        counts.data *= self.idf()[counts.indices]
+        return normalize(counts)
+
+_content_vectorizer = ContentVectorizer()
+
 # Build event content matrix
-def build_event_content_matrix(events):
-    df = pd.DataFrame(events)
-
-    # Combine relevant features into one string per event
-    df['combined'] = (
-        df['event_type'].fillna('') + ' ' +
-        df['location'].fillna('') + ' ' +
-        df['start_time'].fillna('').astype(str)
+def build_event_content_matrix(events, vectorizer=None):
+    """TF-IDF content rows of the events, embedding only those the vectorizer has not seen in this form"""
+    vectorizer = vectorizer or _content_vectorizer
+    event_ids = [event['id'] for event in events]
+    added = vectorizer.update(event_ids, [event_content_text(event) for event in events])
+    if added:
+        logger.info(f"Embedded {added} new or changed events into the content matrix")
+    return vectorizer.transform(event_ids), np.array(event_ids)
+
+def co_interaction_vectors(matrix, event_columns):
+    """Unit-length liked-by-user vectors of every catalogue event, zero for events nobody liked"""
+    liked = normalize(matrix.multiply(matrix > 0).T.tocsr()) if matrix.shape[1] else sp.csr_matrix((0, matrix.shape[0]))
+    present = np.flatnonzero(event_columns >= 0)
+    select = sp.csr_matrix(
+        (np.ones(len(present)), (present, event_columns[present])), shape=(len(event_columns), matrix.shape[1])
+    )
+    return (select @ liked).tocsr()
+
+def build_item_neighbours(content, co_interaction, k=ITEM_NEIGHBOURS_K, content_share=ITEM_CONTENT_SHARE):
+    """Top-k most similar events of every catalogue event, mixing content and co-interaction cosine.
+
+    Both inputs have unit-length rows in catalogue order. Returns (neighbours, similarities):
+    int32 and float32 arrays of shape (events, k), best first, with -1 / 0 padding where
+    an event has fewer than k neighbours with any similarity.
+    """
+    n = content.shape[0]
+    k = min(k, max(n - 1, 0))
+    neighbours = np.full((n, k), -1, dtype=np.int32)
+    similarities = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbours, similarities
+    for start in range(0, n, ITEM_NEIGHBOURS_CHUNK):
+        rows = np.arange(start, min(start + ITEM_NEIGHBOURS_CHUNK, n))
+        block = (content_share * (content[rows] @ content.T) + (1 - content_share) * (co_interaction[rows] @ co_interaction.T)).toarray()
+        block[np.arange(len(rows)), rows] = 0  # an event is not its own neighbour
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+        neighbours[rows] = np.where(top_scores > 0, top, -1)
+        similarities[rows] = np.maximum(top_scores, 0)
+    return neighbours, similarities
+
+def _resize_csr(matrix, shape):
+    """Grow a CSR matrix to `shape` without touching the original"""
+    indptr = np.concatenate([matrix.indptr, np.full(shape[0] - matrix.shape[0], matrix.indptr[-1])])
+    return sp.csr_matrix((matrix.data, matrix.indices, indptr), shape=shape)
+
+def min_max_scale(values):
+    """Scale an array to [0, 1], leaving constant arrays untouched"""
+    if len(values) == 0 or values.max() == values.min():
+        return values
+    return (values - values.min()) / (values.max() - values.min())
+
+class InteractionStore:
+    """Latest rating per (user, event), kept current by pulling only rows past a high-water mark"""
+
+    def __init__(self):
+        self.ratings = {}  # (user_id, event_id) -> (rating, interaction_time)
+        # Per-user exclusion index; entries are replaced, never modified, so snapshots can share them
+        self.disliked = {}  # user_id -> frozenset of event ids marked "not_interested"
+        self.interested = {}  # user_id -> {event_id: interaction_time} of events marked "interested"
+        self.user_ids = []  # matrix row -> user_id
+        self.user_index = {}  # user_id -> matrix row
+        self.event_ids = []  # matrix column -> event_id
+        self.event_index = {}  # event_id -> matrix column
+        self.matrix = None  # CSR users x events ratings
+        self.normalized = None  # matrix with L2-normalised user rows
+        self.popularity = None  # positive interactions per matrix column
+        self.high_water_mark = None
+        self.full_reload_at = 0
+        self.changed_users = set()  # users whose ratings changed in the last incremental load
+
+    def load(self):
+        """Pull interactions into the store, returning the number of changed ratings"""
+        self.changed_users = set()
+        if self.matrix is None or time.time() - self.full_reload_at >= FULL_RELOAD_SECONDS:
+            return self.load_full()
+        df = get_interactions(self.high_water_mark)
+        df['interaction_time'] = pd.to_datetime(df['interaction_time'], errors='coerce', utc=True)
+        self._advance_high_water_mark(df)
+        return self.apply(df)
+
+    def load_full(self):
+        df = get_interactions()
+        df['interaction_time'] = pd.to_datetime(df['interaction_time'], errors='coerce', utc=True)
+        self.ratings = dict(zip(zip(df['user_id'], df['event_id']), zip(df['rating'], df['interaction_time'])))
+        self.disliked, self.interested = {}, {}
+        self._update_exclusions((user_id, event_id, rating, interaction_time)
+                                for (user_id, event_id), (rating, interaction_time) in self.ratings.items())
+        self.matrix, self.user_ids, self.event_ids = build_user_event_matrix(df)
+        self.user_index = {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.event_index = {event_id: col for col, event_id in enumerate(self.event_ids)}
+        # normalize() rejects a matrix without rows, as when nobody has interacted yet
+        self.normalized = normalize(self.matrix) if self.matrix.shape[0] else sp.csr_matrix(self.matrix.shape)
+        # Popularity score - interaction count, only positive interactions are counted
+        self.popularity = np.asarray((self.matrix > 0).sum(axis=0)).ravel()
+        self.high_water_mark = None
+        self._advance_high_water_mark(df)
+        self.full_reload_at = time.time()
+        return len(df)
+
+    def _advance_high_water_mark(self, df):
+        # Rows sharing the high-water mark timestamp are fetched again; apply() skips them
+        latest = df['interaction_time'].max() if len(df) else None
+        if latest is not None and pd.notna(latest):
+            self.high_water_mark = latest.to_pydatetime()
+
+    def apply(self, df):
+        """Apply interaction rows last-write-wins and update the matrix, popularity and user vectors"""
+        changes = []
+        for user_id, event_id, interaction_time, rating in df[['user_id', 'event_id', 'interaction_time', 'rating']].itertuples(index=False):
+            key = (user_id, event_id)
+            previous = self.ratings.get(key)
+            if previous is not None and not interaction_time > previous[1]:
+                continue
+            self.ratings[key] = (rating, interaction_time)
+            changes.append((user_id, event_id, rating, previous[0] if previous else 0, interaction_time))
+            self.changed_users.add(user_id)
+        if not changes:
+            return 0
+        self._update_exclusions((user_id, event_id, rating, interaction_time)
+                                for user_id, event_id, rating, _, interaction_time in changes)
+
+        # New users and events are appended so existing rows and columns keep their index
+        for user_id, event_id, _, _, _ in changes:
+            if user_id not in self.user_index:
+                self.user_index[user_id] = len(self.user_ids)
+                self.user_ids.append(user_id)
+            if event_id not in self.event_index:
+                self.event_index[event_id] = len(self.event_ids)
+                self.event_ids.append(event_id)
+        shape = (len(self.user_ids), len(self.event_ids))
+        rows = np.array([self.user_index[c[0]] for c in changes])
+        cols = np.array([self.event_index[c[1]] for c in changes])
+        new_ratings = np.array([c[2] for c in changes], dtype=float)
+        old_ratings = np.array([c[3] for c in changes], dtype=float)
+
+        delta = sp.csr_matrix((new_ratings - old_ratings, (rows, cols)), shape=shape)
+        self.matrix = _resize_csr(self.matrix, shape) + delta
+        self.matrix.eliminate_zeros()
+
+        # Popularity only counts positive interactions
+        popularity = np.zeros(shape[1], dtype=self.popularity.dtype)
+        popularity[:len(self.popularity)] = self.popularity
+        np.add.at(popularity, cols, (new_ratings > 0).astype(int) - (old_ratings > 0).astype(int))
+        self.popularity = popularity
+
+        # Only the vectors of users with changed ratings are renormalised
+        dirty = np.unique(rows)
+        dirty_mask = np.zeros(shape[0], dtype=bool)
+        dirty_mask[dirty] = True
+        normalized = _resize_csr(self.normalized, shape)
+        normalized = sp.diags((~dirty_mask).astype(float)) @ normalized + \
+            sp.diags(dirty_mask.astype(float)) @ normalize(self.matrix.multiply(dirty_mask[:, None]).tocsr())
+        self.normalized = normalized.tocsr()
+        logger.info(f"Applied {len(changes)} interaction changes for {len(dirty)} users")
+        return len(changes)
+
+    def _update_exclusions(self, ratings):
+        """Fold (user_id, event_id, rating, interaction_time) rows into the exclusion index of their users"""
+        disliked, interested = {}, {}
+        for user_id, event_id, rating, interaction_time in ratings:
+            if user_id not in disliked:
+                disliked[user_id] = set(self.disliked.get(user_id, ()))
+                interested[user_id] = dict(self.interested.get(user_id, {}))
+            disliked[user_id].discard(event_id)
+            interested[user_id].pop(event_id, None)
+            if rating == -1:
+                disliked[user_id].add(event_id)
+            elif rating == 1:
+                interested[user_id][event_id] = interaction_time
+        for user_id in disliked:
+            self.disliked[user_id] = frozenset(disliked[user_id])
+            self.interested[user_id] = interested[user_id]
+
+def _als_half_step(ratings, fixed, current, regularization, alpha, cg_steps=3):
+    """Re-solve every row's factors against the fixed side's factors.
+
+    Each row minimises sum(c * (p - x.y)^2) + regularization * |x|^2 with preference p = 1
+    for positive ratings and 0 otherwise, and confidence c = 1 + alpha for rated cells and 1
+    for the rest. The normal equations of all rows are solved together with a few
+    conjugate gradient steps, which only touches the rated cells.
+    """
+    rows = np.repeat(np.arange(ratings.shape[0]), np.diff(ratings.indptr))
+    cols = ratings.indices
+    extra_confidence = alpha * np.abs(ratings.data)
+    preference = (ratings.data > 0).astype(float)
+    gram = fixed.T @ fixed + regularization * np.eye(fixed.shape[1])
+    target = sp.csr_matrix(((1 + extra_confidence) * preference, cols, ratings.indptr), shape=ratings.shape) @ fixed
+
+    def normal_product(x):
+        dots = np.einsum('ij,ij->i', x[rows], fixed[cols])
+        return x @ gram + sp.csr_matrix((extra_confidence * dots, cols, ratings.indptr), shape=ratings.shape) @ fixed
+
+    x = current.copy()
+    residual = target - normal_product(x)
+    direction = residual.copy()
+    residual_norm = np.einsum('ij,ij->i', residual, residual)
+    for _ in range(cg_steps):
+        product = normal_product(direction)
+        step = residual_norm / np.maximum(np.einsum('ij,ij->i', direction, product), 1e-12)
+        x += step[:, None] * direction
+        residual -= step[:, None] * product
+        new_norm = np.einsum('ij,ij->i', residual, residual)
+        direction = residual + (new_norm / np.maximum(residual_norm, 1e-12))[:, None] * direction
+        residual_norm = new_norm
+    return x
+
+def train_als(matrix, factors=ALS_FACTORS, iterations=ALS_ITERATIONS, regularization=ALS_REGULARIZATION,
+              alpha=ALS_ALPHA, init=None, seed=0):
+    """Implicit-feedback ALS on the users x events ratings matrix.
+
+    Returns (user_factors, event_factors); a user's score for every event is
+    event_factors @ user_factors[row]. init continues from earlier factors, padded with
+    random rows for users and events added since.
+    """
+    rng = np.random.default_rng(seed)
+    n_users, n_events = matrix.shape
+    user_factors = rng.normal(0, 0.01, (n_users, factors))
+    event_factors = rng.normal(0, 0.01, (n_events, factors))
+    if init is not None:
+        previous_users, previous_events = init
+        user_factors[:len(previous_users)] = previous_users[:n_users]
+        event_factors[:len(previous_events)] = previous_events[:n_events]
+    by_event = matrix.T.tocsr()
+    for _ in range(iterations):
+        user_factors = _als_half_step(matrix, event_factors, user_factors, regularization, alpha)
+        event_factors = _als_half_step(by_event, user_factors, event_factors, regularization, alpha)
+    return user_factors, event_factors
+
+@dataclass
+class ModelSnapshot:
+    """Read-only view of everything recommend_events needs, rebuilt in the background"""
+    version: int
+    built_at: float
+    interaction_matrix: sp.csr_matrix
+    normalized: sp.csr_matrix
+    popularity: np.ndarray
+    user_index: dict
+    event_ids: list
+    event_df: pd.DataFrame
+    # event_df rows as dicts keyed by event id, used for response payloads
+    event_records: dict = field(default_factory=dict)
+    catalogue_fingerprint: int = 0
+    # Matrix column of each event_df row, -1 for events nobody has interacted with
+    event_columns: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=int))
+    # Per-user exclusion index, see InteractionStore
+    disliked: dict = field(default_factory=dict)
+    interested: dict = field(default_factory=dict)
+    # When the interactions were pulled; clicks reported after this are applied from the overlay
+    loaded_at: float = 0
+    # event_df position of each event id, and each event's last day (NaT when unknown)
+    event_positions: dict = field(default_factory=dict)
+    last_dates: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype='datetime64[D]'))
+    # Per-event features for preference scoring, in event_df order
+    event_type_codes: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=int))
+    event_type_lookup: dict = field(default_factory=dict)
+    time_buckets: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=int))
+    start_time_text: pd.Series = field(default_factory=lambda: pd.Series(dtype=str))
+    # Event coordinates in radians and the spatial index over the events that have them
+    event_coords: np.ndarray = field(default_factory=lambda: np.zeros((0, 2)))
+    geo_index: object = None
+    geo_index_rows: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=int))
+    # ALS factors by matrix row / column, None when the neighbourhood engine is in use
+    user_factors: np.ndarray = None
+    event_factors: np.ndarray = None
+    # Catalogue position of each matrix column (-1 for events no longer listed) and the
+    # item-item neighbour table over catalogue positions, see build_item_neighbours()
+    column_positions: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=int))
+    item_neighbours: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.int32))
+    item_similarities: np.ndarray = field(default_factory=lambda: np.zeros((0, 0), dtype=np.float32))
+
+    def to_catalogue(self, values):
+        """Reorder a per-matrix-column array to event_df order, filling 0 for events without interactions"""
+        out = np.zeros(len(self.event_columns))
+        present = self.event_columns >= 0
+        out[present] = values[self.event_columns[present]]
+        return out
+
+def build_last_dates(event_df):
+    """Last day of every event in event_df order: the end date, else the start date"""
+    if event_df.empty:
+        return np.zeros(0, dtype='datetime64[D]')
+    last = event_df['event_end_date'].where(event_df['event_end_date'].notna(), event_df['event_start_date'])
+    return pd.to_datetime(last, errors='coerce').to_numpy().astype('datetime64[D]')
+
+def build_event_features(event_df):
+    """Encode event types as integer codes and bucket start times into TIME_BUCKETS indexes (-1 if unknown)"""
+    if event_df.empty:
+        return np.zeros(0, dtype=int), {}, np.zeros(0, dtype=int), pd.Series(dtype=str)
+    event_type_codes, event_types = pd.factorize(event_df['event_type'])
+    start_time_text = event_df['start_time'].astype(str)
+    hours = start_time_text.str.extract(r'^(\d{1,2})[:.]')[0].astype(float).to_numpy()
+    time_buckets = np.select(
+        [(hours >= 5) & (hours < 12), (hours >= 12) & (hours < 17), (hours >= 17) & (hours < 22), (hours >= 22) | (hours < 5)],
+        [0, 1, 2, 3],
+        default=-1,
+    )
+    return event_type_codes, {event_type: code for code, event_type in enumerate(event_types)}, time_buckets, start_time_text
+
+_snapshot = None
+_snapshot_version = 0
+_snapshot_build_lock = threading.Lock()
+_refresher_thread = None
+_interaction_store = InteractionStore()
+
+def build_snapshot(previous=None):
+    """Load new interactions and the events and precompute the structures used for scoring.
+
+    Returns `previous` unchanged when neither the interactions nor the event catalogue changed,
+    so cached recommendations keyed on its version stay valid.
+    """
+    global _snapshot_version
+    started = time.time()
+    store = _interaction_store
+    full_reload = store.matrix is None or time.time() - store.full_reload_at >= FULL_RELOAD_SECONDS
+    # Events first: if they fail to load, the store has not consumed interactions this snapshot misses
+    events = get_all_events()
+    loaded_at = time.time()
+    changes = store.load()
+    _recommendation_cache.invalidate(store.changed_users)
+    catalogue_fingerprint = hash(tuple(tuple(event.values()) for event in events))
+    if previous is not None and not full_reload and changes == 0 and catalogue_fingerprint == previous.catalogue_fingerprint:
+        logger.info(f"No changes since snapshot v{previous.version}, keeping it")
+        return previous
+    event_df = pd.DataFrame(events)
+    event_ids = event_df['id'].tolist() if len(event_df) else []
+    event_type_codes, event_type_lookup, time_buckets, start_time_text = build_event_features(event_df)
+    event_coords, geo_index, geo_index_rows = build_geo_index(event_df)
+    event_columns = np.array([store.event_index.get(event_id, -1) for event_id in event_ids], dtype=int)
+    column_positions = np.full(len(store.event_ids), -1, dtype=int)
+    column_positions[event_columns[event_columns >= 0]] = np.flatnonzero(event_columns >= 0)
+    item_neighbours, item_similarities = build_item_neighbours(
+        build_event_content_matrix(events)[0],
+        co_interaction_vectors(store.matrix, event_columns),
     )
+    user_factors = event_factors = None
+    if COLLAB_ENGINE == 'als' and store.matrix.shape[0] and store.matrix.shape[1]:
+        # Matrix rows and columns keep their index between full reloads, so factors carry over
+        warm = previous is not None and previous.user_factors is not None and not full_reload
+        user_factors, event_factors = train_als(
+            store.matrix,
+            iterations=ALS_REFRESH_ITERATIONS if warm else ALS_ITERATIONS,
+            init=(previous.user_factors, previous.event_factors) if warm else None,
+        )
+
+    # The store keeps mutating on later refreshes; its sparse matrices and arrays are
+    # replaced rather than modified, but the id lists and maps are appended to in place
+    _snapshot_version += 1
+    snapshot = ModelSnapshot(
+        version=_snapshot_version,
+        built_at=time.time(),
+        disliked=dict(store.disliked),
+        interested=dict(store.interested),
+        loaded_at=loaded_at,
+        interaction_matrix=store.matrix,
+        normalized=store.normalized,
+        popularity=store.popularity,
+        user_index=dict(store.user_index),
+        event_ids=list(store.event_ids),
+        event_df=event_df,
+        event_records={event['id']: event for event in events},
+        catalogue_fingerprint=catalogue_fingerprint,
+        event_columns=event_columns,
+        event_positions={event_id: position for position, event_id in enumerate(event_ids)},
+        last_dates=build_last_dates(event_df),
+        event_type_codes=event_type_codes,
+        event_type_lookup=event_type_lookup,
+        time_buckets=time_buckets,
+        start_time_text=start_time_text,
+        event_coords=event_coords,
+        geo_index=geo_index,
+        geo_index_rows=geo_index_rows,
+        user_factors=user_factors,
+        event_factors=event_factors,
+        column_positions=column_positions,
+        item_neighbours=item_neighbours,
+        item_similarities=item_similarities,
+    )
+    logger.info(f"Model snapshot v{snapshot.version} built in {time.time() - started:.2f}s")
+    return snapshot
+
+def refresh_snapshot():
+    """Rebuild the model snapshot and swap it in atomically"""
+    global _snapshot
+    with _snapshot_build_lock:
+        _snapshot = build_snapshot(_snapshot)
+        _interaction_overlay.prune(_snapshot.loaded_at)
+    return _snapshot
+
+def _snapshot_refresher():
+    while True:
+        time.sleep(SNAPSHOT_REFRESH_SECONDS)
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            logger.error(f"Background snapshot refresh failed, keeping v{_snapshot.version}: {e}")
+
+def get_snapshot():
+    """Return the current model snapshot, building it and starting the refresher on first use"""
+    global _snapshot, _refresher_thread
+    if _snapshot is None:
+        with _snapshot_build_lock:
+            if _snapshot is None:
+                _snapshot = build_snapshot()
+    if _refresher_thread is None and SNAPSHOT_REFRESH_SECONDS > 0:
+        with _snapshot_build_lock:
+            if _refresher_thread is None:
+                _refresher_thread = threading.Thread(target=_snapshot_refresher, name='snapshot-refresher', daemon=True)
+                _refresher_thread.start()
+    return _snapshot
+
+def get_disliked_event_ids(snapshot, user_id):
+    """Events the user marked as 'not_interested'"""
+    return snapshot.disliked.get(user_id, frozenset())
+
+def get_recent_event_ids(snapshot, user_id):
+    """Events the user marked "interested" within the last 2 minutes"""
+    recent_threshold = datetime.now(UTC) - timedelta(minutes=2)
+    return {event_id for event_id, interaction_time in snapshot.interested.get(user_id, {}).items()
+            if interaction_time > recent_threshold}
+
+# Rating stored for each action_type, as in get_interactions()
+ACTION_RATINGS = {'interested': 1, 'not_interested': -1}
+
+class InteractionOverlay:
+    """Clicks the backend reported through /invalidate that the current snapshot may not include yet.
+
+    Entries are dropped once a snapshot has loaded interactions after they were reported.
+    """
+
+    def __init__(self):
+        self._entries = {}  # user_id -> {event_id: (rating, interaction_time, reported_at)}
+        self._lock = threading.Lock()
+
+    def record(self, user_id, event_id, rating):
+        with self._lock:
+            self._entries.setdefault(user_id, {})[event_id] = (rating, datetime.now(UTC), time.time())
+
+    def get(self, snapshot, user_id):
+        """[(event_id, rating, interaction_time)] of the user's clicks newer than the snapshot"""
+        with self._lock:
+            entries = self._entries.get(user_id, {})
+            return [(event_id, rating, interaction_time)
+                    for event_id, (rating, interaction_time, reported_at) in entries.items()
+                    if reported_at >= snapshot.loaded_at]
+
+    def prune(self, loaded_at):
+        with self._lock:
+            for user_id in list(self._entries):
+                entries = {event_id: entry for event_id, entry in self._entries[user_id].items() if entry[2] >= loaded_at}
+                if entries:
+                    self._entries[user_id] = entries
+                else:
+                    del self._entries[user_id]
+
+_interaction_overlay = InteractionOverlay()
+
+def get_exclusions(snapshot, user_id, fresh=()):
+    """(disliked, recently interested) event ids of a user, with interactions newer than the snapshot applied"""
+    if not fresh:
+        return get_disliked_event_ids(snapshot, user_id), get_recent_event_ids(snapshot, user_id)
+    disliked = set(get_disliked_event_ids(snapshot, user_id))
+    interested = dict(snapshot.interested.get(user_id, {}))
+    for event_id, rating, interaction_time in fresh:
+        disliked.discard(event_id)
+        interested.pop(event_id, None)
+        if rating == -1:
+            disliked.add(event_id)
+        elif rating == 1:
+            interested[event_id] = interaction_time
+    recent_threshold = datetime.now(UTC) - timedelta(minutes=2)
+    return disliked, {event_id for event_id, interaction_time in interested.items() if interaction_time > recent_threshold}
+
+class RecommendationCache:
+    """LRU cache of ranked event ids per user, valid for one snapshot version and user version.
+
+    Entries are ranked without the time-based "recently interested" exclusion, which callers
+    apply when reading, and hold a few more events than were asked for to make up for it.
+    """
+
+    def __init__(self, max_size=10000, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (snapshot_version, user_version, created_at, depth, ranked_ids)
+        self._user_versions = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def user_version(self, user_id):
+        with self._lock:
+            return self._user_versions[user_id]
+
+    def invalidate(self, user_ids):
+        """Drop cached rankings of users whose interactions or profile changed"""
+        with self._lock:
+            for user_id in user_ids:
+                self._user_versions[user_id] += 1
+                self._entries.pop(user_id, None)
+
+    def get(self, user_id, snapshot_version, top_n):
+        """Return (depth, ranked_ids) if a fresh entry covering top_n exists, else None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry_snapshot, entry_user, created_at, depth, ranked_ids = entry
+                if (entry_snapshot == snapshot_version and entry_user == self._user_versions[user_id]
+                        and time.monotonic() - created_at < self.ttl and depth >= top_n):
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return depth, ranked_ids
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user_id, snapshot_version, user_version, depth, ranked_ids):
+        with self._lock:
+            if user_version != self._user_versions[user_id]:
+                return  # invalidated while this ranking was being computed
+            self._entries[user_id] = (snapshot_version, user_version, time.monotonic(), depth, ranked_ids)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def metrics(self):
+        with self._lock:
+            return {'size': len(self._entries), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+_recommendation_cache = RecommendationCache(RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL)
+
+def user_similarity_rows(snapshot, target_rows, top_k=NEIGHBOUR_TOP_K):
+    """Cosine similarity of several users against every user, one column per target user"""
+    similarity = snapshot.normalized @ snapshot.normalized[target_rows].toarray().T
+    if 0 < top_k < similarity.shape[0]:
+        np.put_along_axis(similarity, np.argpartition(-similarity, top_k, axis=0)[top_k:], 0, axis=0)
+    return similarity
+
+def user_similarity_row(snapshot, target_idx, top_k=NEIGHBOUR_TOP_K):
+    """Cosine similarity of one user against every user, optionally keeping only the top_k neighbours"""
+    return user_similarity_rows(snapshot, [target_idx], top_k).ravel()
+
+def collaborative_scores(snapshot, target_rows):
+    """Collaborative score of every matrix column for several users, one column per user"""
+    if snapshot.user_factors is not None:
+        return snapshot.event_factors @ snapshot.user_factors[target_rows].T
+    return snapshot.interaction_matrix.T @ user_similarity_rows(snapshot, target_rows)
+
+def item_neighbour_scores(snapshot, target_idx):
+    """Score every event in event_df order by its similarity to the events the user liked.
+
+    Only the neighbour lists of the liked events are read and summed.
+    """
+    scores = np.zeros(len(snapshot.event_columns))
+    row = snapshot.interaction_matrix[target_idx]
+    liked = snapshot.column_positions[row.indices[row.data > 0]]
+    liked = liked[liked >= 0]
+    neighbours = snapshot.item_neighbours[liked].ravel()
+    present = neighbours >= 0
+    np.add.at(scores, neighbours[present], snapshot.item_similarities[liked].ravel()[present])
+    return scores
+
+def preference_scores(snapshot, preferences):
+    """Score every event in event_df order against the user's preferred categories and time of day"""
+    scores = np.zeros(len(snapshot.event_type_codes))
+    categories = preferences.get("eventCategories")
+    if categories:
+        if isinstance(categories, str):
+            categories = [categories]
+        codes = [snapshot.event_type_lookup[c] for c in categories if c in snapshot.event_type_lookup]
+        scores += CATEGORY_MATCH_SCORE * np.isin(snapshot.event_type_codes, codes)
+    preferred_time = preferences.get("preferredTime")
+    if preferred_time:
+        if preferred_time in TIME_BUCKETS:
+            matches = snapshot.time_buckets == TIME_BUCKETS.index(preferred_time)
+        else:
+            # Older profiles store a literal time fragment such as "18:"
+            matches = snapshot.start_time_text.str.contains(preferred_time, regex=False).to_numpy()
+        scores += TIME_MATCH_SCORE * matches
+    return scores
+
+def candidate_mask(snapshot, excluded_ids=(), user_lat=None, user_lon=None, radius_km=None):
+    """Boolean mask over event_df of events that may be recommended.
+
+    Excluded ids are always dropped; past events and events beyond radius_km only when
+    UPCOMING_PREFILTER / DISTANCE_PREFILTER are on.
+    """
+    candidates = np.ones(len(snapshot.event_columns), dtype=bool)
+    if UPCOMING_PREFILTER:
+        # NaT compares False, so events without dates stay in
+        candidates &= ~(snapshot.last_dates < np.datetime64(datetime.now(UTC).date(), 'D'))
+    if DISTANCE_PREFILTER and user_lat is not None and user_lon is not None and radius_km is not None:
+        candidates &= events_within_distance(snapshot, user_lat, user_lon, radius_km)
+    excluded = [snapshot.event_positions[event_id] for event_id in excluded_ids if event_id in snapshot.event_positions]
+    candidates[excluded] = False
+    return candidates
+
+def top_positions(scores, candidates, depth):
+    """Positions of the `depth` best scores among candidates, best first, in O(n).
+
+    Ties keep event_df order, as a stable sort over every candidate would.
+    """
+    positions = np.flatnonzero(candidates)
+    if depth <= 0:
+        return positions[:0]
+    if depth < len(positions):
+        values = scores[positions]
+        threshold = np.partition(values, len(values) - depth)[len(values) - depth]
+        above = positions[values > threshold]
+        tied = positions[values == threshold][:depth - len(above)]
+        positions = np.sort(np.concatenate([above, tied]))
+    return positions[np.argsort(-scores[positions], kind='stable')]
+
+def rank_events(snapshot, user_id, profile, collab_scores=None, depth=10, disliked_ids=None):
+    """Combine the score components for one user and return the best `depth` event ids.
+
+    collab_scores is indexed by matrix column, or None for a cold-start user. Events the
+    user marked interested in the last 2 minutes are left in; see select_recommendations().
+    """
+    if disliked_ids is None:
+        disliked_ids = get_disliked_event_ids(snapshot, user_id)
+    preferences, user_lat, user_lon = profile
+
+    # Custom score based on preferences
+    content_scores = preference_scores(snapshot, preferences)
+
+    if collab_scores is None:
+        # Content-based fallback using preferences
+        combined_scores = min_max_scale(content_scores)
+    else:
+        combined_scores = (
+            COLLAB_WEIGHT * min_max_scale(snapshot.to_catalogue(collab_scores)) +
+            CONTENT_WEIGHT * min_max_scale(content_scores) +
+            POPULAR_WEIGHT * min_max_scale(snapshot.to_catalogue(snapshot.popularity.astype(float)))
+        )
+        target_idx = snapshot.user_index.get(user_id)
+        if target_idx is not None and len(snapshot.item_neighbours):
+            combined_scores += ITEM_WEIGHT * min_max_scale(item_neighbour_scores(snapshot, target_idx))
+
+    # Apply distance penalty to scores
+    if user_lat is not None and user_lon is not None:
+        combined_scores = apply_distance_penalty(combined_scores, snapshot, user_lat, user_lon, preferences)
+
+    # Exclude events marked as "not_interested" (rating -1)
+    candidates = candidate_mask(snapshot, disliked_ids, user_lat, user_lon, get_max_distance_km(preferences))
+    event_ids = snapshot.event_df['id'].to_numpy() if len(snapshot.event_df) else np.zeros(0, dtype=int)
+    return event_ids[top_positions(combined_scores, candidates, depth)].tolist()
+
+def select_recommendations(snapshot, user_id, ranked_ids, top_n, excluded_ids=None):
+    """Drop events marked as "interested" very recently (within last 2 minutes) and keep the top N.
+
+    excluded_ids defaults to the snapshot's recent events; callers pass get_exclusions() results
+    so that events disliked since the ranking was cached are dropped as well.
+    """
+    if excluded_ids is None:
+        excluded_ids = get_recent_event_ids(snapshot, user_id)
+    return [event_id for event_id in ranked_ids if event_id not in excluded_ids][:top_n]
 
-    vectorizer = TfidfVectorizer()
-    content_matrix = vectorizer.fit_transform(df['combined'])
+def get_cached_recommendations(snapshot, user_id, top_n, excluded_ids=None):
+    """Top N from the recommendation cache, or None when there is no usable entry"""
+    cached = _recommendation_cache.get(user_id, snapshot.version, top_n)
+    if cached is None:
+        return None
+    depth, ranked_ids = cached
+    recommended_ids = select_recommendations(snapshot, user_id, ranked_ids, top_n, excluded_ids)
+    # A short list is only trustworthy if the entry already held every candidate
+    if len(recommended_ids) < top_n and len(ranked_ids) == depth:
+        return None
+    return recommended_ids
 
-    return content_matrix, df['id'].values
+def rank_and_cache(snapshot, user_id, profile, collab_scores, top_n, user_version, exclusions=None, cache=True):
+    """Rank events for a user, store the ranking in the cache and return the top N.
+
+    cache=False ranks without storing, for rankings made from a stand-in profile.
+    """
+    disliked_ids, recent_ids = exclusions if exclusions is not None else get_exclusions(snapshot, user_id)
+    depth = top_n + max(RECOMMENDATION_CACHE_DEPTH, len(recent_ids))
+    ranked_ids = rank_events(snapshot, user_id, profile, collab_scores, depth, disliked_ids)
+    if cache:
+        _recommendation_cache.put(user_id, snapshot.version, user_version, depth, ranked_ids)
+    return select_recommendations(snapshot, user_id, ranked_ids, top_n, recent_ids)
+
+def popular_events(snapshot, top_n=10):
+    """Most positively rated events, used when scoring a user fails"""
+    order = np.argsort(-snapshot.popularity, kind='stable')[:top_n]
+    return [snapshot.event_ids[col] for col in order if snapshot.popularity[col] > 0]
 
 # Recommend events for a user
-def recommend_events(user_id, top_n=10):
+def recommend_events(user_id, top_n=10, snapshot=None):
     user_id = int(user_id)  # Ensure user_id is always an int for indexing
     logger.info(f"Starting recommendation process for user {user_id}")
+    snapshot = snapshot or get_snapshot()
     try:
-        # Get user preferences and location
-        preferences = get_user_preferences(user_id)
-        user_lat, user_lon = get_user_location(user_id)
-        
-        # Get user's interaction data
-        df = get_interactions()
-        interaction_matrix = build_user_event_matrix(df)
-        events = get_all_events()
-        event_df = pd.DataFrame(events)
+        exclusions = get_exclusions(snapshot, user_id, _interaction_overlay.get(snapshot, user_id))
+        recommended_ids = get_cached_recommendations(snapshot, user_id, top_n, exclusions[0] | exclusions[1])
+        if recommended_ids is not None:
+            logger.info(f"Served {len(recommended_ids)} cached recommendations for user {user_id}")
+            return recommended_ids
+        user_version = _recommendation_cache.user_version(user_id)
 
-        # Check for cold start scenario
-        target_idx = interaction_matrix.index.get_loc(user_id) if user_id in interaction_matrix.index else None
-
-        if target_idx is None:
-            # Content-based fallback using preferences
-            content_scores = []
-            for _, event in event_df.iterrows():
-                score = 0
-                if preferences.get("eventCategories") and event["event_type"] in preferences["eventCategories"]:
-                    score += 1
-                if preferences.get("preferredTime") and preferences["preferredTime"] in str(event["start_time"]):
-                    score += 0.5
-                content_scores.append(score)
-            content_scores = pd.Series(content_scores, index=event_df["id"])
-
-            def normalize(series):
-                return (series - series.min()) / (series.max() - series.min()) if series.max() != series.min() else series
-
-            content_scores_norm = normalize(content_scores)
-            scores_dict = content_scores_norm.to_dict()
-        else:
-            similarity = cosine_similarity(interaction_matrix)
-            collab_scores = similarity[target_idx] @ interaction_matrix.values
-            collab_scores = pd.Series(collab_scores, index=interaction_matrix.columns)
-
-            # Custom score based on preferences
-            content_scores = []
-            for _, event in event_df.iterrows():
-                score = 0
-                if preferences.get("eventCategories") and event["event_type"] in preferences["eventCategories"]:
-                    score += 1
-                if preferences.get("preferredTime") and preferences["preferredTime"] in str(event["start_time"]):
-                    score += 0.5
-                content_scores.append(score)
-            content_scores = pd.Series(content_scores, index=event_df["id"])
-
-            # Popularity score - interaction count
-            event_interaction_counts = df[df['rating'] > 0]["event_id"].value_counts()  # Only count positive interactions
-            popular_scores = pd.Series(0, index=collab_scores.index)
-            for event_id, count in event_interaction_counts.items():
-                if event_id in popular_scores:
-                    popular_scores[event_id] = count
-
-            # Score normalization
-            def normalize(series):
-                return (series - series.min()) / (series.max() - series.min()) if series.max() != series.min() else series
-
-            collab_scores_norm = normalize(collab_scores)
-            content_scores_norm = normalize(content_scores)
-            popular_scores_norm = normalize(popular_scores)
-
-            combined_scores = (
-                COLLAB_WEIGHT * collab_scores_norm +
-                CONTENT_WEIGHT * content_scores_norm +
-                POPULAR_WEIGHT * popular_scores_norm
-            )
-
-            scores_dict = combined_scores.to_dict()
-            recommendations = event_df.to_dict(orient="records")
-
-        # Apply distance penalty to scores
-        if user_lat is not None and user_lon is not None:
-            scores_dict = apply_distance_penalty(scores_dict, list(scores_dict.keys()), user_lat, user_lon, preferences)
-            
-            # Get current time and threshold for recent interactions
-            now = datetime.now().replace(tzinfo=None)  # make naive datetime
-            recent_threshold = now - timedelta(minutes=2)
-
-            # Ensure interaction_time is datetime
-            df['interaction_time'] = pd.to_datetime(df['interaction_time'], errors='coerce')
-
-            # Filter events
-            filtered_ids = df[
-                (df['user_id'] == user_id) &
-                (
-                    (df['rating'] == -1) |
-                    ((df['rating'] == 1) & (df['interaction_time'] > recent_threshold))
-                )
-            ]['event_id'].tolist()
+        # Get user preferences and location; without them the ranking is served but not cached
+        profile_loaded = True
+        try:
+            profile = get_user_profile(user_id)
+        except Exception:
+            profile, profile_loaded = DEFAULT_PROFILE, False
 
-            # Exclude filtered
-            scores_dict = {k: v for k, v in scores_dict.items() if k not in filtered_ids}
-            
-            # Sort by final scores and get top N
-            recommended_ids = sorted(scores_dict.keys(), key=lambda x: scores_dict[x], reverse=True)[:top_n]
-        else:
-            # If no location data, just sort by scores
-            # Get current time and threshold for recent interactions
-            now = datetime.now(UTC)
-            recent_threshold = now - timedelta(minutes=2)
-
-            # Exclude events that are:
-            # - marked as "not_interested" (rating -1), or
-            # - marked as "interested" very recently (within last 2 minutes)
-            df['interaction_time'] = pd.to_datetime(df.get('interaction_time'), errors='coerce')  # safe datetime parsing
-
-            filtered_ids = df[
-                (df['user_id'] == user_id) &
-                (
-                    (df['rating'] == -1) |
-                    ((df['rating'] == 1) & (df['interaction_time'] > recent_threshold))
-                )
-            ]['event_id'].tolist()
-
-            scores_dict = {k: v for k, v in scores_dict.items() if k not in filtered_ids}
-            
-            recommended_ids = sorted(scores_dict.keys(), key=lambda x: scores_dict[x], reverse=True)[:top_n]
+        # Check for cold start scenario
+        target_idx = snapshot.user_index.get(user_id)
+        collab_scores = None
+        if target_idx is not None:
+            collab_scores = collaborative_scores(snapshot, [target_idx]).ravel()
 
-        logger.info(f"Generated {len(recommended_ids)} recommendations for user {user_id}")
+        recommended_ids = rank_and_cache(
+            snapshot, user_id, profile, collab_scores, top_n, user_version, exclusions, cache=profile_loaded
+        )
+        logger.info(f"Generated {len(recommended_ids)} recommendations for user {user_id} from snapshot v{snapshot.version}")
         return recommended_ids
     except Exception as e:
         logger.error(f"Error in recommend_events for user {user_id}: {e}")
         # Fallback to popular events if there's an error
         logger.info("Falling back to popular events due to error")
-        return df[df['rating'] == 1]['event_id'].value_counts().head(top_n).index.tolist()
+        return popular_events(snapshot, top_n)
+
+def recommend_events_batch(user_ids, top_n=10, snapshot=None):
+    """Recommend events for many users, scoring each chunk of known users with one matrix product.
 
-def get_user_preferences(user_id):
-    """Fetch user preferences from the database"""
+    Cached rankings are reused and fresh ones are cached, so this also warms the cache.
+    """
+    user_ids = [int(user_id) for user_id in user_ids]
+    logger.info(f"Starting batch recommendation for {len(user_ids)} users")
+    snapshot = snapshot or get_snapshot()
+    results = {}
+    exclusions = {user_id: get_exclusions(snapshot, user_id, _interaction_overlay.get(snapshot, user_id)) for user_id in user_ids}
+    for user_id in user_ids:
+        disliked_ids, recent_ids = exclusions[user_id]
+        recommended_ids = get_cached_recommendations(snapshot, user_id, top_n, disliked_ids | recent_ids)
+        if recommended_ids is not None:
+            results[user_id] = recommended_ids
+    misses = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in results]
+    user_versions = {user_id: _recommendation_cache.user_version(user_id) for user_id in misses}
+    profiles_loaded = True
     try:
-        conn = get_db_connection()
-        query = """
-            SELECT preferences FROM users WHERE user_id = %s
-        """
-        cursor = conn.cursor()
-        cursor.execute(query, (user_id,))
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        
-        if result and result[0]:
-            return result[0]
-        return {}
-    except Exception as e:
-        logger.error(f"Error fetching user preferences: {e}")
-        return {}
+        profiles = get_user_profiles(misses) if misses else {}
+    except Exception:
+        profiles, profiles_loaded = {user_id: DEFAULT_PROFILE for user_id in misses}, False
+    for start in range(0, len(misses), BATCH_CHUNK_SIZE):
+        chunk = misses[start:start + BATCH_CHUNK_SIZE]
+        warm = [user_id for user_id in chunk if user_id in snapshot.user_index]
+        collab_columns = {}
+        if warm:
+            collab = collaborative_scores(snapshot, [snapshot.user_index[user_id] for user_id in warm])
+            collab_columns = {user_id: collab[:, i] for i, user_id in enumerate(warm)}
+        for user_id in chunk:
+            try:
+                results[user_id] = rank_and_cache(
+                    snapshot, user_id, profiles[user_id], collab_columns.get(user_id), top_n, user_versions[user_id],
+                    exclusions[user_id], cache=profiles_loaded
+                )
+            except Exception as e:
+                logger.error(f"Error in recommend_events_batch for user {user_id}: {e}")
+                results[user_id] = popular_events(snapshot, top_n)
+    logger.info(f"Generated batch recommendations for {len(results)} users ({len(misses)} computed) from snapshot v{snapshot.version}")
+    return results
 
 def get_all_events():
-    """Fetch all events from the database"""
+    """Fetch all events from the database.
+
+    Errors are raised, not turned into an empty catalogue, so a failed snapshot refresh
+    keeps the previous snapshot.
+    """
     try:
-        conn = get_db_connection()
         query = """
             SELECT id, title, event_type, location, event_start_date, 
                    event_end_date, start_time, end_time, tickets, 
-                   description, link_to, image_url 
+                   description, link_to, image_url, latitude, longitude
             FROM events
         """
-        cursor = conn.cursor()
-        cursor.execute(query)
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn, conn.cursor() as cursor:
+            cursor.execute(query)
+            result = cursor.fetchall()
         
         return [{
             'id': row[0],
@@ -359,11 +1258,13 @@ def get_all_events():
             'tickets': row[8],
             'description': row[9],
             'link_to': row[10],
-            'image_url': row[11]
+            'image_url': row[11],
+            'latitude': row[12],
+            'longitude': row[13]
         } for row in result]
     except Exception as e:
         logger.error(f"Error fetching events: {e}")
-        return []
+        raise
 
 def getGoogleMapsEmbedUrl(location):
     if not location or location == 'Unknown' or location == 'Miesto Neznáme' or location == 'Miesto neznáme':
@@ -378,24 +1279,92 @@ def getGoogleMapsEmbedUrl(location):
     
     return mapUrl
 
+def format_event(event):
+    """Shape an event row into the payload the frontend expects"""
+    location = event['location'] or 'Miesto Neznáme'
+    return {
+        'id': event['id'],
+        'title': event['title'],
+        'category': event['event_type'],
+        'location': location,
+        'map_url': getGoogleMapsEmbedUrl(location),
+        'event_start_date': event['event_start_date'].strftime('%Y-%m-%d') if event['event_start_date'] else None,
+        'event_end_date': event['event_end_date'].strftime('%Y-%m-%d') if event['event_end_date'] else None,
+        'start_time': str(event['start_time']) if event['start_time'] else None,
+        'end_time': str(event['end_time']) if event['end_time'] else None,
+        'tickets': event['tickets'],
+        'shortText': event['description'],
+        'link_to': event['link_to'],
+        'image': event['image_url'] or 'https://images.unsplash.com/photo-1540575861501-7cf05a4b125a?ixlib=rb-4.0.3&auto=format&fit=crop&w=320&q=80'
+    }
+
 @app.route("/health", methods=["GET"])
 def health():
     logger.info("Health check requested")
     try:
-        df = get_interactions()
-        user_count = df['user_id'].nunique()
-        event_count = df['event_id'].nunique()
+        snapshot = get_snapshot()
+        user_count, event_count = snapshot.interaction_matrix.shape
         logger.info(f"Health check successful - Users: {user_count}, Events: {event_count}")
         return jsonify({
             "status": "ok",
             "users_known": user_count,
             "events_known": event_count,
+            "snapshot_version": snapshot.version,
+            "snapshot_age": time.time() - snapshot.built_at,
+            "collab_engine": "als" if snapshot.user_factors is not None else "neighbourhood",
+            "db_pool": _db_pool.metrics(),
+            "recommendation_cache": _recommendation_cache.metrics(),
             "timestamp": time.time()
         })
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+def service_request_authorized():
+    """True when the request carries the shared secret; always False while none is configured"""
+    return bool(SERVICE_SECRET) and hmac.compare_digest(request.headers.get('X-Service-Secret', ''), SERVICE_SECRET)
+
+@app.route("/refresh", methods=["POST"])
+def refresh():
+    if not service_request_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    logger.info("Snapshot refresh requested")
+    try:
+        snapshot = refresh_snapshot()
+        return jsonify({"status": "ok", "snapshot_version": snapshot.version})
+    except Exception as e:
+        logger.error(f"Snapshot refresh failed: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route("/invalidate", methods=["POST"])
+def invalidate():
+    """Drop cached recommendations for users whose preferences, location or interactions changed.
+
+    With event_id and action_type, the click is also applied to the user's exclusions until a
+    snapshot includes it.
+    """
+    if not service_request_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        body = {}
+    user_ids = body.get('user_ids') or ([body['user_id']] if body.get('user_id') is not None else [])
+    if not isinstance(user_ids, list):
+        return jsonify({"error": "user_ids must be a list"}), 400
+    try:
+        user_ids = [int(user_id) for user_id in user_ids]
+        event_id = int(body['event_id']) if body.get('event_id') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "user_id and event_id must be integers"}), 400
+    if not user_ids:
+        return jsonify({"error": "user_id or user_ids is required"}), 400
+    if event_id is not None:
+        if len(user_ids) != 1:
+            return jsonify({"error": "event_id needs a single user_id"}), 400
+        _interaction_overlay.record(user_ids[0], event_id, ACTION_RATINGS.get(body.get('action_type'), 0))
+    _recommendation_cache.invalidate(user_ids)
+    return jsonify({"status": "ok", "invalidated": len(user_ids)})
+
 @app.route("/recommend", methods=["GET"])
 def recommend():
     try:
@@ -404,57 +1373,58 @@ def recommend():
             return jsonify({"error": "user_id is required"}), 400
 
         # Get recommended event IDs
-        recommended_event_ids = recommend_events(user_id)
+        snapshot = get_snapshot()
+        recommended_event_ids = recommend_events(user_id, snapshot=snapshot)
         
         # If there are no recommended events, return an empty list
         if not recommended_event_ids:
             return jsonify([])
 
-        # Get full event data for recommended events
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Create a parameterized query with the correct number of placeholders
-        placeholders = ','.join(['%s'] * len(recommended_event_ids))
-        query = f"""
-            SELECT id, title, event_type, location, event_start_date, 
-                   event_end_date, start_time, end_time, tickets, 
-                   description, link_to, image_url 
-            FROM events 
-            WHERE id IN ({placeholders})
-        """
-        
-        cursor.execute(query, recommended_event_ids)
-        events = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        # Format the response with proper time handling
-        formatted_events = []
-        for event in events:
-            location = event[3] or 'Miesto Neznáme'
-            formatted_event = {
-                'id': event[0],
-                'title': event[1],
-                'category': event[2],
-                'location': location,
-                'map_url': getGoogleMapsEmbedUrl(location),
-                'event_start_date': event[4].strftime('%Y-%m-%d') if event[4] else None,
-                'event_end_date': event[5].strftime('%Y-%m-%d') if event[5] else None,
-                'start_time': str(event[6]) if event[6] else None,
-                'end_time': str(event[7]) if event[7] else None,
-                'tickets': event[8],
-                'shortText': event[9],
-                'link_to': event[10],
-                'image': event[11] or 'https://images.unsplash.com/photo-1540575861501-7cf05a4b125a?ixlib=rb-4.0.3&auto=format&fit=crop&w=320&q=80'
-            }
-            formatted_events.append(formatted_event)
-        
+        # Event data comes from the snapshot the recommendations were ranked on
+        formatted_events = [
+            format_event(snapshot.event_records[event_id])
+            for event_id in recommended_event_ids
+            if event_id in snapshot.event_records
+        ]
+
         return jsonify(formatted_events)
     except Exception as e:
         logger.error(f"Error in recommend endpoint: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/recommend/batch", methods=["POST"])
+def recommend_batch():
+    try:
+        body = request.get_json(silent=True) or {}
+        user_ids = body.get('user_ids')
+        if not isinstance(user_ids, list) or not user_ids:
+            return jsonify({"error": "user_ids must be a non-empty list"}), 400
+        if len(user_ids) > BATCH_MAX_USERS:
+            return jsonify({"error": f"At most {BATCH_MAX_USERS} user_ids per request"}), 400
+        top_n = int(body.get('top_n', 10))
+        if not 1 <= top_n <= BATCH_MAX_TOP_N:
+            return jsonify({"error": f"top_n must be between 1 and {BATCH_MAX_TOP_N}"}), 400
+
+        snapshot = get_snapshot()
+        recommendations = recommend_events_batch(user_ids, top_n=top_n, snapshot=snapshot)
+
+        return jsonify({
+            "snapshot_version": snapshot.version,
+            "recommendations": {
+                str(user_id): [
+                    format_event(snapshot.event_records[event_id])
+                    for event_id in event_ids
+                    if event_id in snapshot.event_records
+                ]
+                for user_id, event_ids in recommendations.items()
+            }
+        })
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid request: {e}"}), 400
+    except Exception as e:
+        logger.error(f"Error in recommend batch endpoint: {e}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == "__main__":
     logger.info("Starting scikit-learn based recommendation service...")
     app.run(host="0.0.0.0", port=8000, debug=False)
@@ -0,0 +1,136 @@
+"""Scraper benchmarks: page parsing, date parsing and the cross-source dedup index.
+
+Run with `python benchmark.py` from this directory; pages come from fixtures/ and no
+network or database is needed.
+"""
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
+from bs4 import BeautifulSoup
+import psycopg2
+
+with mock.patch.object(psycopg2, 'connect'):
+    import scrapping
+
+from dedup import DedupIndex, shingles, jaccard, TITLE_SIMILARITY
+from dates import MONTHS, parse_date_range, parse_dmy, find_dates, is_upcoming
+from parsing import PARSER, make_soup, SL_DETAIL, GOPRESOV_DETAIL, SEVEROVYCHOD_DETAIL
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+PAGES = [
+    ('staralubovna', SL_DETAIL, lambda soup: scrapping.parse_sl_event(soup, 'fixture')),
+    ('gopresov', GOPRESOV_DETAIL, lambda soup: scrapping.parse_gopresov_event(soup, 'fixture')),
+    ('severovychod', SEVEROVYCHOD_DETAIL, lambda soup: scrapping.parse_severovychod_event(soup, 'fixture', None, None, None)),
+    ('ajdnes', None, lambda soup: scrapping.parse_ajdnes_event(soup, 'fixture')),
+]
+
+def _timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+def bench_parsing(repeat=200):
+    print(f"{'':<14}{'html.parser':>13}{PARSER + ' scoped':>16}{'speedup':>9}")
+    for name, strainer, parse in PAGES:
+        with open(os.path.join(FIXTURES, f'{name}_detail.html'), 'rb') as f:
+            content = f.read()
+        before, before_time = _timed(lambda: parse(BeautifulSoup(content, 'html.parser')), repeat)
+        after, after_time = _timed(lambda: parse(make_soup(content, strainer)), repeat)
+        assert before == after, f"{name}: scoped parsing changed the result"
+        print(f"{name:<14}{before_time * 1000:>11.2f}ms{after_time * 1000:>14.2f}ms{before_time / after_time:>8.1f}x")
+
+def date_corpus(n=20000, seed=42):
+    """(text, expected (start, end)) in every shape the sites write dates in"""
+    rng = random.Random(seed)
+    names = {}
+    for name, month in MONTHS.items():
+        names.setdefault(month, []).append(name)
+    today = date.today()
+    corpus = []
+    for _ in range(n):
+        start = today + timedelta(days=rng.randint(-400, 800))
+        end = start + timedelta(days=rng.randint(1, 60))
+        name = rng.choice(names[start.month])
+        corpus += [
+            (f"{start:%d.%m.%Y}", (start, None)),
+            (f"{start.day} {name} {start.year}", (start, None)),
+            (f"{start.day}. {name.capitalize()} {start.year}", (start, None)),
+            (f"{start.day}.{start.month}. - {end:%d.%m.%Y}", (start, end)),
+            (f"{start:%d.%m.%Y} - {end:%d.%m.%Y}", (start, end)),
+        ]
+        if (start.month, start.year) == (end.month, end.year):
+            corpus.append((f"{start.day} - {end.day} {name} {end.year}", (start, end)))
+        else:
+            end_name = rng.choice(names[end.month])
+            corpus.append((f"{start.day} {name} - {end.day} {end_name} {end.year}", (start, end)))
+    for text in ['31.02.2030', '32 sep 2030', '20 foo 2030', '20', 'Dátum neznámy', '']:
+        corpus.append((text, (None, None)))
+    return corpus
+
+def check_dates(corpus):
+    """Properties every parse has to hold, checked over the whole corpus"""
+    today = date.today()
+    for text, expected in corpus:
+        start, end = parse_date_range(text)
+        assert (start, end) == expected, f"{text!r}: {(start, end)} != {expected}"
+        if start and end:
+            assert start <= end, text
+            if text.endswith(f"{end:%d.%m.%Y}"):
+                assert find_dates(text)[-1] == end, text
+        if start and not end and text[:1].isdigit() and '.' in text and ' ' not in text:
+            assert parse_dmy(text) == start, text
+        assert is_upcoming(start, end) == (start is not None and (end or start) >= today), text
+
+def bench_dates(n=20000):
+    corpus = date_corpus(n)
+    check_dates(corpus)
+    texts = [text for text, _ in corpus]
+    dmy = [f"{expected[0]:%d.%m.%Y}" for _, expected in corpus if expected[0]]
+    _, range_time = _timed(lambda: [parse_date_range(text) for text in texts], 3)
+    _, dmy_time = _timed(lambda: [parse_dmy(text) for text in dmy], 3)
+    _, strptime_time = _timed(lambda: [datetime.strptime(text, '%d.%m.%Y').date() for text in dmy], 3)
+    print(f"{len(corpus)} date strings, all properties hold")
+    print(f"parse_date_range: {len(texts) / range_time:>10,.0f}/s")
+    print(f"parse_dmy:        {len(dmy) / dmy_time:>10,.0f}/s  (strptime {len(dmy) / strptime_time:,.0f}/s)")
+
+def dedup_corpus(n, seed=42):
+    """n distinct events plus a variant of every tenth one, as another source would title it"""
+    rng = random.Random(seed)
+    words = [f"{rng.choice('bcdfghjklmnprstvz')}{rng.choice('aeiouy')}{rng.choice('bcdfghjklmnprstvz')}{rng.choice('aeiouy')}"
+             f"{rng.choice('kln')}" for _ in range(3000)]
+    today = date.today()
+    events = []
+    for i in range(n):
+        title = ' '.join(rng.choice(words) for _ in range(rng.randint(3, 5)))
+        events.append((i, title, today + timedelta(days=rng.randint(0, 365)), 49 + rng.random(), 21 + rng.random()))
+    variants = [(f"dup{i}", f"{title.upper()} {today.year}", start, lat + 0.001, lon)
+                for i, title, start, lat, lon in events[::10]]
+    return events, variants
+
+def bench_dedup(sizes=(2000, 4000, 8000)):
+    print(f"{'events':>8}{'index + lookup':>16}{'duplicates found':>18}")
+    for n in sizes:
+        events, variants = dedup_corpus(n)
+        def run():
+            index = DedupIndex()
+            for key, title, start, lat, lon in events:
+                index.add(key, title, start, None, lat, lon)
+            return [index.find(title, start, None, lat, lon) for _, title, start, lat, lon in variants]
+        found, elapsed = _timed(run, 1)
+        recall = sum(match == int(key[3:]) for (key, *_), match in zip(variants, found)) / len(variants)
+        print(f"{n:>8}{elapsed:>15.2f}s{recall:>17.0%}")
+    # All-pairs title comparison, what the index avoids, on the smallest catalogue
+    events, _ = dedup_corpus(sizes[0])
+    title_shingles = [shingles(title) for _, title, *_ in events]
+    _, brute = _timed(lambda: sum(jaccard(a, b) >= TITLE_SIMILARITY for i, a in enumerate(title_shingles) for b in title_shingles[i + 1:]), 1)
+    print(f"all pairs at {sizes[0]}: {brute:.2f}s, growing with the square of the catalogue")
+
+if __name__ == "__main__":
+    scrapping.geocode_location = lambda location: (None, None)
+    bench_parsing()
+    bench_dates()
+    bench_dedup()
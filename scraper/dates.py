@@ -0,0 +1,112 @@
+import re
+from datetime import date
+
+MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'máj': 5, 'maj': 5, 'jún': 6, 'jun': 6,
+    'júl': 7, 'jul': 7, 'aug': 8, 'sep': 9, 'okt': 10, 'nov': 11, 'dec': 12,
+    'január': 1, 'február': 2, 'marec': 3, 'apríl': 4,
+    'august': 8, 'september': 9, 'október': 10, 'november': 11, 'december': 12
+}
+
+DMY = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})')
+DMY_EXACT = re.compile(r'\s*(\d{1,2})\.(\d{1,2})\.(\d{4})\s*')
+# "20", "20.", "20.9.", "20.09.2030", "20 sep", "20 sep 2030", "20. septembra 2030"
+DATE_PART = re.compile(r'\s*(\d{1,2})\.?(?:\s*(\d{1,2})\.?|\s+([^\W\d_]+)\.?)?\s*(\d{4})?\s*')
+TIME_ANYWHERE = re.compile(r'\b(?:[0-1]?[0-9]|2[0-3]):[0-5][0-9]\b')
+TIME_LOOSE = re.compile(r'(\d{1,2})[.:](\d{2})')
+TIME_EXACT = re.compile(r'\d{1,2}:\d{2}')
+
+def month_number(name):
+    name = name.lower()
+    if name in MONTHS:
+        return MONTHS[name]
+    # Genitive and other inflected forms ("septembra", "januára") share the three-letter stem
+    return MONTHS.get(name[:3])
+
+def _date_part(text):
+    """(day, month or None, year or None) for one side of a date range, or None"""
+    match = DATE_PART.fullmatch(text)
+    if not match:
+        return None
+    day, month, month_name, year = match.groups()
+    if month_name:
+        month = month_number(month_name)
+        if month is None:
+            return None
+    return int(day), int(month) if month else None, int(year) if year else None
+
+def parse_date_range(text, default_year=None):
+    """Parse "20 sep 2030", "20 - 22 sep 2030", "20.9. - 22.9.2030" and similar into (start, end) dates.
+
+    A side without a month or year borrows it from the other side; with no year at all the
+    current year is assumed. end is None for a single day. Returns (None, None) when the
+    text is not a date.
+    """
+    start_text, _, end_text = (text or '').partition(' - ')
+    start = _date_part(start_text)
+    end = _date_part(end_text) if end_text else None
+    if start is None or (end_text and end is None):
+        return None, None
+    default_year = default_year or date.today().year
+    day, month, year = start
+    try:
+        if not end:
+            return date(year or default_year, month, day), None
+        end_day, end_month, end_year = end
+        end_date = date(end_year or year or default_year, end_month or month, end_day)
+        start_date = date(year or end_date.year, month or end_date.month, day)
+        if start_date > end_date and not year:
+            # "28 dec - 3 jan 2031" starts in the previous year
+            start_date = start_date.replace(year=start_date.year - 1)
+        return start_date, end_date
+    except (TypeError, ValueError):
+        return None, None
+
+def parse_dmy(text):
+    """Strict dd.mm.yyyy, raising ValueError like strptime does"""
+    match = DMY_EXACT.fullmatch(text)
+    if not match:
+        raise ValueError(f"'{text}' is not a dd.mm.yyyy date")
+    day, month, year = match.groups()
+    return date(int(year), int(month), int(day))
+
+def find_dates(text):
+    """Every valid dd.mm.yyyy date in the text, in order"""
+    dates = []
+    for day, month, year in DMY.findall(text or ''):
+        try:
+            dates.append(date(int(year), int(month), int(day)))
+        except ValueError:
+            continue
+    return dates
+
+def date_bounds(dates):
+    """(start, end) from the first two dates found, end None when there is only one"""
+    if not dates:
+        return None, None
+    return dates[0], dates[1] if len(dates) > 1 else None
+
+def is_upcoming(start, end, today=None):
+    """An event is upcoming while its last day has not passed"""
+    last = end or start
+    return last is not None and last >= (today or date.today())
+
+def last_time_in(text):
+    """The last HH:MM mentioned in free text, e.g. a description"""
+    matches = TIME_ANYWHERE.findall(text or '')
+    if not matches:
+        return None
+    hours, minutes = matches[-1].split(':')
+    return f"{int(hours):02d}:{minutes}"
+
+def parse_time(text):
+    """First "18.30" or "18:30" in the text as "18:30" """
+    match = TIME_LOOSE.search(text or '')
+    return f"{match.group(1)}:{match.group(2)}" if match else None
+
+def parse_time_range(text):
+    """(start, end) from "10:00 - 20:00" or "10:00"; anything else has no start"""
+    if ' - ' in text:
+        start_time, end_time = text.split(' - ', 1)
+        return start_time, end_time
+    return (text if TIME_EXACT.fullmatch(text) else None), None
@@ -0,0 +1,103 @@
+import math
+import random
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+
+TITLE_SIMILARITY = 0.6  # Jaccard similarity of title shingles for two events to be the same
+DATE_TOLERANCE_DAYS = 1
+GEO_TOLERANCE_KM = 3.0
+SHINGLE_SIZE = 3
+LSH_BANDS = 16
+LSH_ROWS = 4  # bands * rows MinHash values per title; catches pairs from roughly (1/bands) ** (1/rows) ~ 0.5 up
+
+_PRIME = 4294967311  # smallest prime above 2**32, keeps the permutation arithmetic in small ints
+_rng = random.Random(20)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(LSH_BANDS * LSH_ROWS)]
+_NON_WORD = re.compile(r'[\W_]+')
+
+def normalize_title(title):
+    """Lowercase, no diacritics, no punctuation: "Prešovský jarmok!" -> "presovsky jarmok" """
+    title = unicodedata.normalize('NFKD', title or '')
+    title = ''.join(c for c in title if not unicodedata.combining(c))
+    return _NON_WORD.sub(' ', title.casefold()).strip()
+
+def shingles(title):
+    text = f" {normalize_title(title)} "
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def minhash(title_shingles):
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in title_shingles]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+class DedupIndex:
+    """Near-duplicate lookup over events from every source.
+
+    Titles are bucketed by MinHash LSH bands, so a lookup only compares against events
+    sharing a band instead of the whole catalogue. Candidates must also have a similar
+    title, and dates and coordinates must not disagree. A title alone is not enough: at
+    least one of overlapping dates or nearby coordinates has to confirm the match.
+    """
+
+    def __init__(self, threshold=TITLE_SIMILARITY, date_tolerance=DATE_TOLERANCE_DAYS, geo_tolerance=GEO_TOLERANCE_KM):
+        self.threshold = threshold
+        self.date_tolerance = date_tolerance
+        self.geo_tolerance = geo_tolerance
+        self._records = []  # (key, shingles, start, end, latitude, longitude)
+        self._buckets = defaultdict(list)
+
+    def __len__(self):
+        return len(self._records)
+
+    def _bands(self, signature):
+        for band in range(LSH_BANDS):
+            yield band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])
+
+    def _dates_overlap(self, start, end, other_start, other_end):
+        """None when either side has no dates"""
+        if start is None or other_start is None:
+            return None
+        end, other_end = end or start, other_end or other_start
+        return (start - other_end).days <= self.date_tolerance and (other_start - end).days <= self.date_tolerance
+
+    def _near(self, latitude, longitude, other_latitude, other_longitude):
+        """None when either side is not geocoded"""
+        if None in (latitude, longitude, other_latitude, other_longitude):
+            return None
+        return distance_km(latitude, longitude, other_latitude, other_longitude) <= self.geo_tolerance
+
+    def add(self, key, title, start=None, end=None, latitude=None, longitude=None):
+        title_shingles = shingles(title)
+        position = len(self._records)
+        self._records.append((key, title_shingles, start, end, latitude, longitude))
+        for band in self._bands(minhash(title_shingles)):
+            self._buckets[band].append(position)
+
+    def find(self, title, start=None, end=None, latitude=None, longitude=None):
+        """Key of the most similar indexed event that is the same event, or None"""
+        title_shingles = shingles(title)
+        candidates = set()
+        for band in self._bands(minhash(title_shingles)):
+            candidates.update(self._buckets.get(band, ()))
+        best_key, best_similarity = None, self.threshold
+        for position in candidates:
+            key, other_shingles, other_start, other_end, other_latitude, other_longitude = self._records[position]
+            similarity = jaccard(title_shingles, other_shingles)
+            if similarity < best_similarity:
+                continue
+            dates = self._dates_overlap(start, end, other_start, other_end)
+            near = self._near(latitude, longitude, other_latitude, other_longitude)
+            if dates is not False and near is not False and (dates or near):
+                best_key, best_similarity = key, similarity
+        return best_key
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+MAX_WORKERS = 8  # detail pages fetched at once across all hosts
+PER_HOST_CONCURRENCY = 4  # requests in flight to a single host
+FETCH_WINDOW = 2  # fetches submitted ahead of the consumer, per worker
+POLITENESS_DELAY = 0.25  # seconds between request starts to the same host
+REQUEST_TIMEOUT = 10
+PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'page_cache.sqlite3'))
+PAGE_CACHE_MAX_AGE = int(os.getenv('PAGE_CACHE_MAX_AGE', str(7 * 24 * 3600)))  # reparse unchanged pages at least this often
+
+def create_session_with_retries():
+    session = requests.Session()
+    retry_strategy = Retry(
+        total=3,  # number of retries
+        backoff_factor=1,  # wait 1, 2, 4 seconds between retries
+        status_forcelist=[500, 502, 503, 504]  # HTTP status codes to retry on
+    )
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=PER_HOST_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class PageCache:
+    """Validators and content hash of each detail page as of the last successful run.
+
+    New entries are staged while a run fetches and only persisted by commit(), once the
+    events parsed from them are in the DB, so failed or interrupted writes do not mark
+    their pages as done.
+    """
+
+    def __init__(self, path=PAGE_CACHE_PATH, max_age=PAGE_CACHE_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.unchanged = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            '''CREATE TABLE IF NOT EXISTS pages (
+                   url TEXT PRIMARY KEY,
+                   etag TEXT,
+                   last_modified TEXT,
+                   content_hash TEXT NOT NULL,
+                   parsed_at REAL NOT NULL
+               )'''
+        )
+        self._db.commit()
+
+    def get(self, url):
+        """Returns (etag, last_modified, content_hash, parsed_at), or None if missing or too old"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT etag, last_modified, content_hash, parsed_at FROM pages WHERE url = ?', (url,)
+            ).fetchone()
+        if row is None or time.time() - row[3] > self.max_age:
+            return None
+        return row
+
+    def stage(self, url, etag, last_modified, content_hash, parsed_at=None):
+        with self._lock:
+            self._pending[url] = (etag, last_modified, content_hash, parsed_at or time.time())
+
+    def mark_unchanged(self):
+        with self._lock:
+            self.unchanged += 1
+
+    def commit(self, urls=None):
+        """Persist staged entries, all of them or only those for the given URLs"""
+        with self._lock:
+            urls = list(self._pending) if urls is None else [url for url in dict.fromkeys(urls) if url in self._pending]
+            self._db.executemany(
+                'INSERT OR REPLACE INTO pages (url, etag, last_modified, content_hash, parsed_at) VALUES (?, ?, ?, ?, ?)',
+                [(url, *self._pending.pop(url)) for url in urls]
+            )
+            self._db.commit()
+
+    def discard(self):
+        with self._lock:
+            self._pending.clear()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class HostLimiter:
+    """Caps concurrent requests per host and spaces out their start times"""
+
+    def __init__(self, per_host=PER_HOST_CONCURRENCY, delay=POLITENESS_DELAY):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> [semaphore, earliest next start]
+
+    def _slot(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = [threading.BoundedSemaphore(self.per_host), 0.0]
+            return self._hosts[host]
+
+    def acquire(self, url):
+        host = urlsplit(url).netloc
+        slot = self._slot(host)
+        slot[0].acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, slot[1])
+            slot[1] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
+        return host
+
+    def release(self, host):
+        self._slot(host)[0].release()
+
+class Fetcher:
+    """Fetches pages concurrently over keep-alive sessions, politely per host.
+
+    Each worker thread keeps its own requests.Session, since sessions are not safe to
+    share between threads.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, per_host=PER_HOST_CONCURRENCY, delay=POLITENESS_DELAY,
+                 timeout=REQUEST_TIMEOUT, headers=None, session_factory=create_session_with_retries, page_cache=None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.headers = headers
+        self.limiter = HostLimiter(per_host, delay)
+        self._session_factory = session_factory
+        self._local = threading.local()
+        self.page_cache = page_cache
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self._session_factory()
+        return self._local.session
+
+    def get(self, url, **kwargs):
+        """Fetch one URL, waiting for the host's concurrency slot and politeness delay"""
+        kwargs.setdefault('timeout', self.timeout)
+        if self.headers is not None:
+            kwargs.setdefault('headers', self.headers)
+        host = self.limiter.acquire(url)
+        try:
+            return self._session().get(url, **kwargs)
+        finally:
+            self.limiter.release(host)
+
+    def _get_if_changed(self, url, **kwargs):
+        """Conditional GET against the page cache; returns None when the page has not changed"""
+        if self.page_cache is None:
+            return self.get(url, **kwargs)
+        cached = self.page_cache.get(url)
+        if cached:
+            etag, last_modified, content_hash, parsed_at = cached
+            headers = dict(kwargs.get('headers') or self.headers or {})
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+            kwargs['headers'] = headers
+        response = self.get(url, **kwargs)
+        if cached and response.status_code == 304:
+            self.page_cache.mark_unchanged()
+            return None
+        if response.status_code != 200:
+            return response
+        digest = hashlib.sha256(response.content).hexdigest()
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if cached and digest == content_hash:
+            # Same body, possibly new validators; keep the original parse time so max_age still applies
+            self.page_cache.stage(url, etag, last_modified, digest, parsed_at)
+            self.page_cache.mark_unchanged()
+            return None
+        self.page_cache.stage(url, etag, last_modified, digest)
+        return response
+
+    def fetch_all(self, urls, conditional=True, **kwargs):
+        """Fetch URLs concurrently, yielding (url, response, error) in completion order.
+
+        With a page cache and conditional set, pages that have not changed since they were
+        last parsed are not yielded. Only FETCH_WINDOW fetches per worker are in flight or
+        waiting to be yielded at a time, so a slow consumer holds back fetching instead of
+        letting finished pages pile up in memory.
+        """
+        urls = iter(dict.fromkeys(urls))
+        fetch = self._get_if_changed if conditional else self.get
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+
+            def top_up():
+                for url in islice(urls, FETCH_WINDOW * self.max_workers - len(futures)):
+                    futures[executor.submit(fetch, url, **kwargs)] = url
+
+            top_up()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    top_up()
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        yield url, None, e
+                        continue
+                    if response is None:
+                        continue
+                    yield url, response, None
@@ -0,0 +1,141 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import requests
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_HEADERS = {"User-Agent": "okruhly-stol-app"}
+NOMINATIM_MIN_INTERVAL = 1.0  # seconds between requests, per Nominatim's usage policy
+GEOCODE_CACHE_PATH = os.getenv('GEOCODE_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'geocode_cache.sqlite3'))
+GEOCODE_TTL = int(os.getenv('GEOCODE_TTL', str(90 * 24 * 3600)))  # venues rarely move
+GEOCODE_NEGATIVE_TTL = int(os.getenv('GEOCODE_NEGATIVE_TTL', str(7 * 24 * 3600)))  # retry unknown places weekly
+REQUEST_TIMEOUT = 10
+
+def normalize_location(location):
+    """Cache key for a location string: case, spacing and stray punctuation are ignored"""
+    location = re.sub(r'\s+', ' ', location or '').strip(' ,.;-').casefold()
+    return re.sub(r'\s*,\s*', ', ', location)
+
+class GeocodeCache:
+    """Location -> coordinates on disk; a None pair records a place Nominatim does not know"""
+
+    def __init__(self, path=GEOCODE_CACHE_PATH, ttl=GEOCODE_TTL, negative_ttl=GEOCODE_NEGATIVE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            '''CREATE TABLE IF NOT EXISTS geocode (
+                   location TEXT PRIMARY KEY,
+                   latitude REAL,
+                   longitude REAL,
+                   resolved_at REAL NOT NULL
+               )'''
+        )
+        self._db.commit()
+
+    def get(self, key):
+        """Returns (hit, (lat, lon)); expired entries are misses"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT latitude, longitude, resolved_at FROM geocode WHERE location = ?', (key,)
+            ).fetchone()
+        if row is None:
+            return False, (None, None)
+        latitude, longitude, resolved_at = row
+        ttl = self.ttl if latitude is not None else self.negative_ttl
+        if time.time() - resolved_at > ttl:
+            return False, (None, None)
+        return True, (latitude, longitude)
+
+    def put(self, key, latitude, longitude):
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO geocode (location, latitude, longitude, resolved_at) VALUES (?, ?, ?, ?)',
+                (key, latitude, longitude, time.time())
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = (None, None)
+
+class Geocoder:
+    """Cached Nominatim lookups shared by all scraper threads.
+
+    Concurrent requests for the same location wait for a single lookup, and lookups
+    for different locations are spaced at least NOMINATIM_MIN_INTERVAL apart.
+    """
+
+    def __init__(self, cache=None, min_interval=NOMINATIM_MIN_INTERVAL, url=NOMINATIM_URL):
+        self.cache = cache if cache is not None else GeocodeCache()
+        self.min_interval = min_interval
+        self.url = url
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self._request_lock = threading.Lock()
+        self._next_request_at = 0.0
+        self._inflight = {}
+        self.hits = 0
+        self.lookups = 0
+
+    def geocode(self, location):
+        key = normalize_location(location)
+        if not key:
+            return None, None
+        hit, coords = self.cache.get(key)
+        if hit:
+            self.hits += 1
+            return coords
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            return flight.result
+        try:
+            flight.result = self._resolve(key, location)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+        return flight.result
+
+    def _resolve(self, key, location):
+        # Another flight for this key may have finished between our cache miss and taking the lead
+        hit, coords = self.cache.get(key)
+        if hit:
+            self.hits += 1
+            return coords
+        try:
+            data = self._request(location)
+        except Exception as e:
+            # Transient failures are not cached, the next run tries again
+            print(f"Error geocoding {location}: {e}")
+            return None, None
+        coords = (float(data[0]["lat"]), float(data[0]["lon"])) if data else (None, None)
+        self.cache.put(key, *coords)
+        return coords
+
+    def _request(self, location):
+        with self._request_lock:
+            wait = self._next_request_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self.lookups += 1
+                params = {"q": location, "format": "json", "limit": 1}
+                response = self.session.get(self.url, params=params, headers=NOMINATIM_HEADERS, timeout=REQUEST_TIMEOUT)
+                response.raise_for_status()
+                return response.json()
+            finally:
+                self._next_request_at = time.monotonic() + self.min_interval
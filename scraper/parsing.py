@@ -0,0 +1,32 @@
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+def has_class(pattern):
+    """Class matcher for strainers; it sees the raw class attribute, so match any position in the list"""
+    return re.compile(rf'(^|\s)({pattern})(\s|$)')
+
+# Parts of each page the scrapers read; everything else (menus, scripts, footers) is never built into the tree
+SL_LISTING = SoupStrainer('h2', class_=has_class('media-heading'))
+SL_DETAIL = SoupStrainer('div', class_=has_class('event-detail'))
+GOPRESOV_LISTING = SoupStrainer('h4', class_=has_class('mec-event-title'))
+GOPRESOV_DETAIL = SoupStrainer(class_=has_class(r'mec-[\w-]+'))
+SEVEROVYCHOD_LISTING = SoupStrainer('a', class_=has_class('side-slider-slide-link'))
+SEVEROVYCHOD_DETAIL = SoupStrainer(class_=has_class(r'ct-[\w-]+|single-poi-[\w-]+|wp-block-image|aligncenter'))
+
+def make_soup(content, only=None):
+    """Parse a page with the fastest available backend, optionally keeping only the strained parts"""
+    return BeautifulSoup(content, PARSER, parse_only=only)
+
+def text_or(tag, default):
+    return tag.text.strip() if tag else default
+
+def dd_after(container, label, default):
+    """Text of the <dd> following the <dt> with the given label"""
+    dt = container.find('dt', string=label)
+    return dt.find_next('dd').text.strip() if dt else default